@@ -0,0 +1,101 @@
+"""
+So sánh chi phí serialize JSON theo từng endpoint: đường mặc định của FastAPI
+(jsonable_encoder + json.dumps) với func.fast_json (stdlib / orjson, encode_model).
+
+    python -m benchmarks.json_benchmark --iterations 200
+
+Payload giả lập kích thước thực tế của từng endpoint, không cần DB.
+Chạy từ thư mục gốc repo (cần config/config.yaml).
+"""
+import argparse
+import datetime
+import json
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from func import fast_json
+from model.db_model import Alarm, CameraConfigPublicWithTags, TagPublic
+
+
+def alarm_rows(count: int) -> List[dict]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        {
+            "id": i, "camera_id": i % 40 + 1, "error_detail": f"E{i % 12}", "location": f"B0{i % 9} 4F",
+            "timestamp": now - datetime.timedelta(seconds=i), "is_confirmed": False,
+            "alarm_uuid": f"00000000-0000-0000-0000-{i:012d}",
+            "metadata_path": f"static/alarms/2025-01-01/camera_{i % 40}/{i}_metadata.json",
+            "img_error": f"static/alarms/2025-01-01/camera_{i % 40}/{i}_error_image.png",
+            "video_error": None, "ai_log_path": None, "camera_name": f"Cam{i % 40:02d}",
+        }
+        for i in range(count)
+    ]
+
+
+def camera_models(count: int) -> List[CameraConfigPublicWithTags]:
+    tags = [TagPublic(id=1, tag_name="panorama"), TagPublic(id=2, tag_name="abnormal detection")]
+    return [
+        CameraConfigPublicWithTags(
+            id=i, name=f"Cam{i:02d}", location=f"B0{i % 9} 4F", webrtc_ip=f"http://10.0.0.{i}:8889/cam",
+            panorama=i % 2, preview_image_url=f"http://10.0.0.{i}/preview.jpg", tags=tags,
+        )
+        for i in range(count)
+    ]
+
+
+def fastapi_default(content) -> bytes:
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def measure(label: str, encode, payload, iterations: int) -> float:
+    encode(payload)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = encode(payload)
+    elapsed = (time.perf_counter() - start) / iterations * 1000
+    print(f"    {label:24s} {elapsed:8.3f} ms  ({len(body)} bytes)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    rows_500 = alarm_rows(500)
+    alarms_500 = [Alarm(**row) for row in rows_500]
+    payloads = {
+        "/alarms/unconfirmed (500 rows)": rows_500,
+        "/worker-events (page 30)": {"total": 123456, "current": 1, "size": 30, "data": alarm_rows(30)},
+        "/sys/info (websocket)": {"cpu": {"percent": 12.5, "cores": [3.1] * 32}, "memory": {"total": 64e9, "used": 12e9}},
+    }
+    backends = [name for name in fast_json.JSON_BACKENDS if name != "orjson" or fast_json.orjson is not None]
+
+    for endpoint, payload in payloads.items():
+        print(endpoint)
+        baseline = measure("fastapi default", fastapi_default, payload, args.iterations)
+        for backend in backends:
+            fast_json.configure_json(backend)
+            elapsed = measure(f"fast_json[{backend}]", fast_json.dumps, payload, args.iterations)
+            print(f"    -> {baseline / elapsed:.1f}x")
+
+    # Endpoint trả model: validate lại + jsonable_encoder so với TypeAdapter dựng sẵn
+    for endpoint, response_type, models in (
+        ("list[Alarm] model (500)", List[Alarm], alarms_500),
+        ("list[CameraConfigPublicWithTags] (100)", List[CameraConfigPublicWithTags], camera_models(100)),
+    ):
+        print(endpoint)
+        adapter = fast_json.model_adapter(response_type)
+        baseline = measure(
+            "fastapi default",
+            lambda value: fastapi_default(adapter.dump_python(adapter.validate_python(value, from_attributes=True), mode="json")),
+            models, args.iterations,
+        )
+        elapsed = measure("encode_model", lambda value: fast_json.encode_model(response_type, value), models, args.iterations)
+        print(f"    -> {baseline / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+So sánh đường đọc ORM (như trước) và đường đọc Core cho danh sách alarm.
+
+    python -m benchmarks.read_path_benchmark --rows 500 --iterations 200
+    python -m benchmarks.read_path_benchmark --seed 5000   # chèn thêm alarm giả vào DB dev trước khi đo
+
+ORM: select(Alarm) -> ORM instance -> validate qua response_model -> jsonable -> json.dumps (như FastAPI).
+Core: select(*columns) -> row mapping -> FastJSONResponse.render.
+Chạy từ thư mục gốc repo (cần config/config.yaml). Chỉ dùng với DB dev.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlmodel import select
+
+from func.fast_json import FastJSONResponse
+from func.projection import table_columns
+from model.db_model import Alarm, async_session_maker
+
+alarm_list_adapter = TypeAdapter(List[Alarm])
+
+
+async def seed_alarms(count: int):
+    now = datetime.datetime.now().astimezone()
+    async with async_session_maker() as session:
+        session.add_all([
+            Alarm(
+                camera_id=None,
+                error_detail=f"BENCH{i % 10}",
+                location="Benchmark",
+                timestamp=now - datetime.timedelta(seconds=i),
+                camera_name="Benchmark",
+                img_error=f"static/alarms/bench/{i}.png",
+            )
+            for i in range(count)
+        ])
+        await session.commit()
+
+
+async def orm_path(rows: int) -> bytes:
+    async with async_session_maker() as session:
+        result = await session.execute(select(Alarm).order_by(Alarm.id.desc()).limit(rows))
+        alarms = result.scalars().all()
+    validated = alarm_list_adapter.validate_python(alarms, from_attributes=True)
+    return json.dumps(alarm_list_adapter.dump_python(validated, mode="json")).encode("utf-8")
+
+
+async def core_path(rows: int) -> bytes:
+    async with async_session_maker() as session:
+        result = await session.execute(select(*table_columns(Alarm)).order_by(Alarm.id.desc()).limit(rows))
+        alarms = [dict(row) for row in result.mappings()]
+    return FastJSONResponse(alarms).body
+
+
+async def measure(name: str, path, rows: int, iterations: int):
+    await path(rows)  # warm up (pool, statement cache)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(iterations):
+        body = await path(rows)
+    wall = (time.perf_counter() - wall_start) / iterations * 1000
+    cpu = (time.process_time() - cpu_start) / iterations * 1000
+    print(f"{name:5s} rows={rows} wall={wall:7.2f} ms  cpu={cpu:7.2f} ms  body={len(body)} bytes")
+    return cpu
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="chèn thêm N alarm giả trước khi đo")
+    args = parser.parse_args()
+
+    if args.seed:
+        await seed_alarms(args.seed)
+    orm_cpu = await measure("orm", orm_path, args.rows, args.iterations)
+    core_cpu = await measure("core", core_path, args.rows, args.iterations)
+    if core_cpu:
+        print(f"CPU speedup: {orm_cpu / core_cpu:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+import asyncio
+import bisect
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from func.static_router.v1.evidence_static import with_evidence_urls
+from model.db_model import Alarm, async_session_maker
+
+HOT_SET_CAPACITY = 5000
+DEFAULT_RESEED_SECONDS = 60
+
+
+class UnconfirmedAlarmSet:
+    """
+    Tập alarm chưa xác nhận giữ trong RAM, sắp theo (timestamp, id).
+    Seed lúc startup, cập nhật bởi create_alarm / confirm_alarm_by_id, nên
+    /alarms/unconfirmed và /alarms/latest trả lời không cần query DB.
+
+    Chỉ đúng trong một process: chạy nhiều worker uvicorn thì mỗi worker chỉ thấy
+    thay đổi của chính nó. alarm_hot_set_reseed_loop nạp lại định kỳ để thay đổi từ
+    worker khác / sửa tay trong DB chỉ trễ tối đa một chu kỳ; cần đúng ngay thì tắt hot set
+    (alarm_hot_set_enabled: false), mọi endpoint đọc DB (có partial index).
+    """
+
+    def __init__(self, capacity: int = HOT_SET_CAPACITY):
+        self.capacity = capacity
+        self.enabled = True
+        self.ready = False
+        self.complete = False   # True nếu đang giữ toàn bộ alarm chưa xác nhận trong DB
+        self._alarms: Dict[int, Alarm] = {}
+        self._rows: Dict[int, dict] = {}      # dict dựng sẵn cho response JSON
+        self._keys: List[Tuple[datetime.datetime, int]] = []  # tăng dần, alarm mới nhất ở cuối
+        # add / discard xảy ra trong lúc seed đang chờ DB, áp lại sau khi thay tập
+        self._seeding = 0
+        self._changes: List[Tuple[str, object]] = []
+
+    async def seed(self, session: Optional[AsyncSession] = None):
+        """Nạp lại từ DB các alarm chưa xác nhận mới nhất (tối đa capacity)."""
+        if not self.enabled:
+            return
+        query = select(Alarm).where(
+            Alarm.is_confirmed == False
+        ).order_by(
+            Alarm.timestamp.desc(), Alarm.id.desc()
+        ).limit(self.capacity + 1)
+        self._seeding += 1
+        start = len(self._changes)
+        try:
+            if session is None:
+                async with async_session_maker() as own_session:
+                    alarms = (await own_session.execute(query)).scalars().all()
+            else:
+                alarms = (await session.execute(query)).scalars().all()
+        finally:
+            self._seeding -= 1
+        changes = self._changes[start:]
+        if not self._seeding:
+            self._changes = []
+
+        self._alarms = {alarm.id: alarm for alarm in alarms[:self.capacity]}
+        self._rows = {alarm.id: alarm.model_dump() for alarm in self._alarms.values()}
+        self._keys = sorted((alarm.timestamp, alarm.id) for alarm in self._alarms.values())
+        self.complete = len(alarms) <= self.capacity
+        self.ready = True
+        for operation, value in changes:
+            if operation == "add":
+                self.add(value)
+            else:
+                self.discard(value)
+
+    def disable(self):
+        """Tắt hot set: latest() luôn trả None, caller đọc DB."""
+        self.enabled = False
+        self.ready = False
+        self.complete = False
+        self._alarms, self._rows, self._keys = {}, {}, []
+
+    def add(self, alarm: Alarm):
+        if self._seeding:
+            self._changes.append(("add", alarm))
+        if not self.ready or alarm.is_confirmed or alarm.id in self._alarms:
+            return
+        key = (alarm.timestamp, alarm.id)
+        if len(self._keys) >= self.capacity and key < self._keys[0]:
+            # Cũ hơn mọi alarm đang giữ: tập không còn đầy đủ
+            self.complete = False
+            return
+        bisect.insort(self._keys, key)
+        self._alarms[alarm.id] = alarm
+        self._rows[alarm.id] = alarm.model_dump()
+        if len(self._keys) > self.capacity:
+            _, oldest_id = self._keys.pop(0)
+            self._alarms.pop(oldest_id, None)
+            self._rows.pop(oldest_id, None)
+            self.complete = False
+
+    def discard(self, alarm_id: int):
+        if self._seeding:
+            self._changes.append(("discard", alarm_id))
+        alarm = self._alarms.pop(alarm_id, None)
+        self._rows.pop(alarm_id, None)
+        if alarm is None:
+            return
+        index = bisect.bisect_left(self._keys, (alarm.timestamp, alarm.id))
+        if index < len(self._keys) and self._keys[index][1] == alarm_id:
+            self._keys.pop(index)
+
+    def _latest_ids(self, limit: int, offset: int) -> Optional[List[int]]:
+        if not self.ready:
+            return None
+        wanted = offset + limit
+        if wanted > len(self._keys) and not self.complete:
+            return None
+        end = len(self._keys) - offset
+        start = max(len(self._keys) - wanted, 0)
+        if end <= 0:
+            return []
+        return [alarm_id for _, alarm_id in reversed(self._keys[start:end])]
+
+    def latest(self, limit: int, offset: int = 0) -> Optional[List[Alarm]]:
+        """
+        Alarm mới nhất trước. Trả None nếu tập chưa seed hoặc không đủ dữ liệu
+        để trả lời chính xác (khi đó caller đọc DB hoặc seed lại).
+        """
+        ids = self._latest_ids(limit, offset)
+        return None if ids is None else [self._alarms[alarm_id] for alarm_id in ids]
+
+    def latest_rows(self, limit: int, offset: int = 0) -> Optional[List[dict]]:
+        """
+        Như latest() nhưng trả dict dựng sẵn, serialize thẳng ra JSON.
+        URL có version của file bằng chứng chỉ tính (os.stat) cho dòng được trả, một lần rồi giữ lại.
+        """
+        ids = self._latest_ids(limit, offset)
+        if ids is None:
+            return None
+        rows = [self._rows[alarm_id] for alarm_id in ids]
+        for row in rows:
+            if "img_error_url" not in row:
+                with_evidence_urls(row)
+        return rows
+
+    def __len__(self):
+        return len(self._keys)
+
+
+unconfirmed_alarms = UnconfirmedAlarmSet()
+
+
+def configure_alarm_hot_set(enabled: Optional[bool] = None):
+    if enabled is not None and not enabled:
+        unconfirmed_alarms.disable()
+
+
+async def alarm_hot_set_reseed_loop(interval_seconds: float):
+    """Task nền: nạp lại hot set định kỳ (bắt alarm tạo / xác nhận bởi worker khác hoặc ngoài API)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if not unconfirmed_alarms.enabled:
+            continue
+        try:
+            await unconfirmed_alarms.seed()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error reseeding unconfirmed alarm hot set: {e}")
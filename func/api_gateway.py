@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import socket
 from fastapi.staticfiles import StaticFiles
@@ -12,12 +13,25 @@ try:
     from func.api_router.v1.user_router import router as user_router   
     from func.static_router.v1.static_router import router as static_router
     from func.static_router.v1.static_router import router2 as static_router_v2
+    from func.static_router.v1.evidence_static import EvidenceStaticFiles
     from func.auth.v1.auth import router as auth_router
     from func.api_router.v1.fakedata_router import router as fakedata_router
     from func.api_router.v1.monitoring_ws import router as monitoring_router
+    from func.api_router.v1.evidence_router import router as evidence_router
+    from func.api_router.v1.storage_router import router as storage_router
+    from func.api_router.v1.stats_router import router as stats_router
+    from func.api_router.v1.export_router import router as export_router
+    from func.storage_usage import storage_reconcile_loop
+    from func.alarm_hot_set import DEFAULT_RESEED_SECONDS, alarm_hot_set_reseed_loop, configure_alarm_hot_set, unconfirmed_alarms
+    from func.filter_dictionary import filter_dictionary, filter_dictionary_rebuild_loop
+    from func.tag_index import tag_index
+    from func.fast_json import FastJSONResponse, configure_json
+    from func.response_cache import configure_response_cache
+    from func.compression import CompressionMiddleware
     from func.logger import Logger
     from func.async_logger import AsyncLogger
     from model.db_model import create_db_and_tables, create_example_data
+    from model.db_migration import run_migrations
     from func.config import Config
 except Exception as e:
     import sys
@@ -28,18 +42,32 @@ except Exception as e:
     from func.api_router.v1.user_router import router as user_router  
     from func.static_router.v1.static_router import router as static_router 
     from func.static_router.v1.static_router import router2 as static_router_v2
+    from func.static_router.v1.evidence_static import EvidenceStaticFiles
     from func.api_router.v1.fakedata_router import router as fakedata_router
     from func.api_router.v1.monitoring_ws import router as monitoring_router
+    from func.api_router.v1.evidence_router import router as evidence_router
+    from func.api_router.v1.storage_router import router as storage_router
+    from func.api_router.v1.stats_router import router as stats_router
+    from func.api_router.v1.export_router import router as export_router
+    from func.storage_usage import storage_reconcile_loop
+    from func.alarm_hot_set import DEFAULT_RESEED_SECONDS, alarm_hot_set_reseed_loop, configure_alarm_hot_set, unconfirmed_alarms
+    from func.filter_dictionary import filter_dictionary, filter_dictionary_rebuild_loop
+    from func.tag_index import tag_index
+    from func.fast_json import FastJSONResponse, configure_json
+    from func.response_cache import configure_response_cache
+    from func.compression import CompressionMiddleware
     from func.auth.v1.auth import router as auth_router
     from func.logger import Logger
     from func.async_logger import AsyncLogger
     from model.db_model import create_db_and_tables, create_example_data
+    from model.db_migration import run_migrations
     from func.config import Config
 
 class FastAPIApp:
     def __init__(self):
         self.create_static_and_template_dir()
-        self.app = FastAPI(lifespan=lifespan)
+        # Mọi response JSON mặc định đi qua FastJSONResponse (orjson nếu có)
+        self.app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
         # self.app.state.logger = Logger()
         self.load_config()
         # self.app.state.config_manager = Config("config.yaml")
@@ -47,6 +75,7 @@ class FastAPIApp:
         self.include_routers()
         self.allow_cors()
         self.add_logging()
+        self.add_compression()
         self.host_static()
         self.host_fake_data()
  
@@ -54,6 +83,9 @@ class FastAPIApp:
         self.config_manager= Config("config/config.yaml")
         self.config_manager.load_config()
         self.app.state.config = self.config_manager.get_config()
+        configure_json(getattr(self.app.state.config, "json_backend", "orjson"))
+        configure_response_cache(getattr(self.app.state.config, "response_cache_ttl_seconds", None))
+        configure_alarm_hot_set(getattr(self.app.state.config, "alarm_hot_set_enabled", None))
 
     def include_routers(self):
         self.app.include_router(camera_config_router)
@@ -63,6 +95,10 @@ class FastAPIApp:
         self.app.include_router(auth_router)
         self.app.include_router(monitoring_router)
         self.app.include_router(static_router_v2)
+        self.app.include_router(evidence_router)
+        self.app.include_router(storage_router)
+        self.app.include_router(stats_router)
+        self.app.include_router(export_router)
         
     def allow_cors(self):
         self.app.add_middleware(
@@ -71,6 +107,7 @@ class FastAPIApp:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=["X-Next-Cursor", "ETag"],
         )
     def add_logging(self):
         @self.app.middleware("http")
@@ -79,6 +116,11 @@ class FastAPIApp:
             self.app.state.logger.log(f"IP: {request.client.host} - Request: {request.method} {request.url} - Response: {response.status_code}", show=False)
             return response
 
+    def add_compression(self):
+        # Nén gzip/br/zstd cho response text (JSON, CSV...), kể cả response stream
+        min_size = getattr(self.app.state.config, "compression_min_size", 1024)
+        self.app.add_middleware(CompressionMiddleware, minimum_size=min_size)
+
     def get_app(self):
         return self.app
     
@@ -86,7 +128,7 @@ class FastAPIApp:
         return self.logger
 
     def host_static(self):
-        self.app.mount("/static", StaticFiles(directory="static"), name="static")
+        self.app.mount("/static", EvidenceStaticFiles(directory="static"), name="static")
         
     def host_fake_data(self):
         self.app.include_router(fakedata_router)
@@ -116,10 +158,23 @@ async def lifespan(app: FastAPI):
     print("Starting FastAPI application...")
     print(f"Loading configuration: {app.state.config}")
     await create_db_and_tables()
+    await run_migrations()
     await create_example_data()
+    await unconfirmed_alarms.seed()
+    await filter_dictionary.rebuild()
+    await tag_index.rebuild()
     app.state.local_ip = read_host_location()
     app.state.host_address = f'http://{app.state.local_ip}:{app.state.config.port}'
+    reconcile_hours = getattr(app.state.config, "storage_reconcile_interval_hours", 24)
+    storage_task = asyncio.create_task(storage_reconcile_loop(reconcile_hours))
+    dictionary_minutes = getattr(app.state.config, "filter_dictionary_rebuild_minutes", 60)
+    dictionary_task = asyncio.create_task(filter_dictionary_rebuild_loop(dictionary_minutes))
+    reseed_seconds = getattr(app.state.config, "alarm_hot_set_reseed_seconds", DEFAULT_RESEED_SECONDS)
+    hot_set_task = asyncio.create_task(alarm_hot_set_reseed_loop(reseed_seconds))
     yield
+    storage_task.cancel()
+    dictionary_task.cancel()
+    hot_set_task.cancel()
     app.state.logger.stop()
     print("Stopping FastAPI application...")
 
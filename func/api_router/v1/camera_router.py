@@ -6,16 +6,32 @@ from typing import Annotated, Optional, List, Union
 from sqlalchemy import String, distinct
 import uuid
 from zipfile import Path
-from fastapi import APIRouter, Depends, Form, HTTPException, Query, UploadFile, File, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Query, UploadFile, File, Request
 from PIL import Image
 import io
 import base64
-from sqlalchemy import func, cast
+from sqlalchemy import func, cast, insert, update
 from sqlmodel import select, delete
 from func.auth.v1.auth import get_current_user
+from func.static_router.v1.evidence_static import versioned_url, with_evidence_urls
+from func.media.tile_pyramid import generate_pyramid
+from func.storage_usage import file_sizes, record_usage
+from func.alarm_hot_set import unconfirmed_alarms
+from func.filter_dictionary import filter_dictionary
+from func.event_rollup import detach_camera, record_event, record_status_change, record_status_changes
+from func.event_filters import filter_alarms, filter_worker_events
+from func.event_facets import DEFAULT_FACET_LIMIT, worker_event_facets
+from func.fast_json import FastJSONResponse, model_response
+from func.table_version import conditional_get, etag_headers, table_versions
+from func.response_cache import response_cache
+from func.tag_index import tag_index
+from func.camera_bulk import BulkImportError, import_cameras, parse_import_file
+from func.projection import negotiated_response, projected_columns, table_columns
+from func.pagination import COUNT_MODE_PATTERN, apply_keyset, count_rows, next_cursor
 from model.db_model import Alarm, CameraConfig, CameraConfigCreate, CameraConfigPublic, CameraConfigPublicWithTags, CameraConfigTagLink, CameraConfigUpdate, Tag, WorkerEvent, WorkerEventActionRequest, WorkerEventConfirmationLog, get_session, UserPublic, AlarmConfirmationLog
-from model.db_model import AlarmConfirmationRequest
+from model.db_model import AlarmConfirmationRequest, AlarmBulkConfirmRequest, WorkerEventBulkActionRequest
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 router = APIRouter(prefix="/v1/cameras",tags=["cameras"])
 from pydantic import BaseModel
 from model.db_model import ErrorDetail 
@@ -37,8 +53,10 @@ async def decline_worker_event_by_id(
             raise HTTPException(status_code=404, detail="Worker event not found")
 
         # Update status to 2 (declined)
+        old_status = worker_event.status
         worker_event.status = 2
         session.add(worker_event)
+        await record_status_change(session, "worker_event", worker_event, old_status)
 
         # Create simplified log without status field
         new_log = WorkerEventConfirmationLog(
@@ -49,6 +67,7 @@ async def decline_worker_event_by_id(
         session.add(new_log)
 
         await session.commit()
+        table_versions.bump("workerevent")
         await session.refresh(worker_event)
         await session.refresh(new_log)
 
@@ -81,8 +100,10 @@ async def accept_worker_event_by_id(
             raise HTTPException(status_code=404, detail="Worker event not found")
 
         # Update status to 1 (accepted)
+        old_status = worker_event.status
         worker_event.status = 1
         session.add(worker_event)
+        await record_status_change(session, "worker_event", worker_event, old_status)
         
         # Create simplified log without status field
         new_log = WorkerEventConfirmationLog(
@@ -93,6 +114,7 @@ async def accept_worker_event_by_id(
         session.add(new_log)
 
         await session.commit()
+        table_versions.bump("workerevent")
         await session.refresh(worker_event)
         await session.refresh(new_log)
 
@@ -107,6 +129,93 @@ async def accept_worker_event_by_id(
         await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     
+def _bulk_selection(stmt, id_column, ids, filters, apply_filters):
+    """
+    WHERE cho thao tác hàng loạt: theo ids và/hoặc filters, bắt buộc có ít nhất một điều kiện.
+    Kiểm tra trên câu lệnh đã build: helper filter bỏ qua giá trị rỗng ("" / 0), nên
+    {"filters": {"error_code": ""}} không được thành UPDATE cả bảng.
+    """
+    filter_values = filters.model_dump(exclude_none=True) if filters else {}
+    filtered = apply_filters(stmt, **filter_values)
+    if not ids and str(filtered.whereclause) == str(stmt.whereclause):
+        raise HTTPException(status_code=400, detail="Provide ids or at least one filter")
+    if ids:
+        filtered = filtered.where(id_column.in_(ids))
+    return filtered
+
+
+async def _bulk_worker_event_action(session: AsyncSession, request_data: WorkerEventBulkActionRequest, new_status: int) -> dict:
+    """
+    Đổi status của nhiều worker event bằng một UPDATE ... RETURNING (tự join với chính bảng để lấy status cũ
+    cho rollup), ghi log bằng một INSERT nhiều dòng, commit một lần. Event đã ở status đích thì bỏ qua.
+    """
+    events = WorkerEvent.__table__
+    old = events.alias("old")
+    stmt = (
+        update(events)
+        .where(events.c.id == old.c.id, events.c.status != new_status)
+        .values(status=new_status)
+        .returning(
+            events.c.id, old.c.status.label("old_status"), events.c.timestamp,
+            events.c.camera_id, events.c.location, events.c.error_detail,
+        )
+    )
+    stmt = _bulk_selection(stmt, events.c.id, request_data.ids, request_data.filters, filter_worker_events)
+    rows = (await session.execute(stmt)).all()
+    if rows:
+        logged_at = datetime.datetime.now()
+        await session.execute(insert(WorkerEventConfirmationLog), [
+            {"worker_event_id": row.id, "action": request_data.action, "logged_at": logged_at} for row in rows
+        ])
+        await record_status_changes(session, "worker_event", [(row, row.old_status, new_status) for row in rows])
+    await session.commit()
+    if rows:
+        table_versions.bump("workerevent")
+    updated_ids = sorted(row.id for row in rows)
+    summary = {"updated": len(updated_ids), "ids": updated_ids}
+    if request_data.ids:
+        summary["skipped_ids"] = sorted(set(request_data.ids) - set(updated_ids))
+    return summary
+
+
+@router.patch("/worker-events/bulk-decline")
+async def bulk_decline_worker_events(
+    *,
+    session: AsyncSession = Depends(get_session),
+    request_data: WorkerEventBulkActionRequest,
+):
+    """
+    Decline hàng loạt worker event theo ids và/hoặc filters (giống filter của GET /worker-events).
+    skipped_ids: id không tồn tại, không khớp filter hoặc đã bị decline từ trước.
+    """
+    try:
+        return {"message": "Worker events declined successfully", **await _bulk_worker_event_action(session, request_data, 2)}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("/worker-events/bulk-accept")
+async def bulk_accept_worker_events(
+    *,
+    session: AsyncSession = Depends(get_session),
+    request_data: WorkerEventBulkActionRequest,
+):
+    """
+    Accept hàng loạt worker event theo ids và/hoặc filters (giống filter của GET /worker-events).
+    skipped_ids: id không tồn tại, không khớp filter hoặc đã được accept từ trước.
+    """
+    try:
+        return {"message": "Worker events accepted successfully", **await _bulk_worker_event_action(session, request_data, 1)}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/error-detail")
 async def create_error_detail(
     *,
@@ -122,8 +231,14 @@ async def create_error_detail(
     """
     try:
         # 1. Xử lý thời gian — nếu người dùng không truyền timestamp thì lấy thời gian hiện tại
-        if not timestamp:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        #    Chuỗi không có múi giờ được hiểu là giờ địa phương của server
+        if timestamp:
+            try:
+                event_time = datetime.datetime.fromisoformat(timestamp).astimezone()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid timestamp, expected 'YYYY-MM-DD HH:MM:SS' or ISO 8601")
+        else:
+            event_time = datetime.datetime.now().astimezone()
 
         # 2. Tạo thư mục lưu ảnh theo ngày
         date_folder = datetime.datetime.now().strftime('%Y-%m-%d')
@@ -149,12 +264,14 @@ async def create_error_detail(
             location=location,
             owner=owner,
             error_name=error_name,
-            timestamp=timestamp,
+            timestamp=event_time,
             image_url=image_relative_path
         )
         session.add(new_error)
+        await record_usage(session, "error-detail", None, datetime.date.today(), *file_sizes([image_relative_path]))
         await session.commit()
         await session.refresh(new_error)
+        filter_dictionary.add("error_detail", location=new_error.location, error_code=new_error.error_name)
 
         # 5. Trả về response
         return {
@@ -165,18 +282,66 @@ async def create_error_detail(
                 "owner": new_error.owner,
                 "error_name": new_error.error_name,
                 "timestamp": new_error.timestamp,
-                "image_url": f"/{image_relative_path}" if image_relative_path else None
+                "image_url": versioned_url(image_relative_path)
             }
         }
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/error-detail")
+async def get_error_details(
+    session: AsyncSession = Depends(get_session),
+    location: Optional[str] = Query(default=None, description="partial match by location"),
+    owner: Optional[str] = Query(default=None, description="partial match by owner"),
+    error_name: Optional[str] = Query(default=None, description="partial match by error_name"),
+    size: int = Query(default=30),
+    page: int = Query(default=1),
+    sort_by: str = Query(default="id", description="sort by field (id, timestamp, location, owner, error_name)"),
+    order: str = Query(default="desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(default=None, description="keyset cursor (next_cursor của trang trước), thay cho page"),
+):
+    """
+    📌 API lấy danh sách ErrorDetail, phân trang theo cursor (keyset) hoặc page
+    """
+    try:
+        stmt = select(ErrorDetail)
+        if location:
+            stmt = stmt.where(ErrorDetail.location.ilike(f"%{location}%"))
+        if owner:
+            stmt = stmt.where(ErrorDetail.owner.ilike(f"%{owner}%"))
+        if error_name:
+            stmt = stmt.where(ErrorDetail.error_name.ilike(f"%{error_name}%"))
+
+        valid_sort_fields = ['id', 'timestamp', 'location', 'owner', 'error_name']
+        actual_sort_by = sort_by if sort_by in valid_sort_fields else 'id'
+        stmt = apply_keyset(stmt, ErrorDetail, actual_sort_by, order, cursor)
+        if not cursor:
+            stmt = stmt.offset((page - 1) * size)
+        result = await session.execute(stmt.limit(size))
+        details = result.scalars().all()
+
+        return {
+            "current": page,
+            "size": size,
+            "next_cursor": next_cursor(details, actual_sort_by, order, size),
+            "data": [
+                {**d.dict(), "image_url": versioned_url(d.image_url)}
+                for d in details
+            ]
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching error details: {str(e)}")
+
 @router.post("/worker-events")
 async def create_worker_event(
     *,
-    camera_id: str = Form(...),
+    camera_id: int = Form(...),
     error_detail: str = Form(...),
     img_error: Union[UploadFile, None, str] = File(None),
     video_error: Union[UploadFile, None, str] = File(None),
@@ -189,16 +354,15 @@ async def create_worker_event(
     """
     try:
         # 1. Lấy thông tin camera từ DB
-        camera_query = select(CameraConfig).where(CameraConfig.id == int(camera_id))
+        camera_query = select(CameraConfig).where(CameraConfig.id == camera_id)
         camera_result = await session.execute(camera_query)
         camera = camera_result.scalars().first()
 
         if not camera:
             raise HTTPException(status_code=404, detail=f"Camera with id {camera_id} not found")
 
-        # 2. Tạo timestamp
-        current_time = datetime.datetime.now()
-        timestamp_str = current_time.strftime('%Y-%m-%d %H:%M:%S')
+        # 2. Tạo timestamp (có múi giờ, lưu vào cột timestamptz)
+        current_time = datetime.datetime.now().astimezone()
 
         # 3. Tạo thư mục lưu trữ
         date_folder = current_time.strftime('%Y-%m-%d')
@@ -248,12 +412,19 @@ async def create_worker_event(
             ai_log_path=ai_log_relative_path,
             location=camera.location,
             camera_name=camera.name,
-            timestamp=timestamp_str,
+            timestamp=current_time,
             is_confirmed=False
         )
         session.add(new_event)
+        await record_event(session, "worker_event", new_event)
+        await record_usage(
+            session, "worker-events", camera_id, current_time.date(),
+            *file_sizes([img_relative_path, video_relative_path, ai_log_relative_path]),
+        )
         await session.commit()
+        table_versions.bump("workerevent")
         await session.refresh(new_event)
+        filter_dictionary.add("worker_event", location=camera.location, camera_name=camera.name, error_code=error_detail)
 
         # 5. Response
         return {
@@ -268,9 +439,9 @@ async def create_worker_event(
                 "timestamp": new_event.timestamp,
             },
             "files": {
-                "image_url": f"/{img_relative_path}" if img_relative_path else None,
-                "video_url": f"/{video_relative_path}" if video_relative_path else None,
-                "ai_log_url": f"/{ai_log_relative_path}" if ai_log_relative_path else None,
+                "image_url": versioned_url(img_relative_path),
+                "video_url": versioned_url(video_relative_path),
+                "ai_log_url": versioned_url(ai_log_relative_path),
             }
         }
 
@@ -280,10 +451,11 @@ async def create_worker_event(
 
 @router.get("/worker-events")
 async def get_worker_events(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     query: Optional[str] = Query(default=None, description="search by camera_id or camera_name"),
     status: Optional[int] = Query(default=None, description="filter by status (0=Pending, 1=OK, 2=NG)"),
-    event_id: Optional[str] = Query(default=None, description="partial match by event ID (as string)"),
+    event_id: Optional[str] = Query(default=None, description="exact or prefix match by event ID"),
     error_code: Optional[str] = Query(default=None, description="partial match by error_detail"),
     location: Optional[str] = Query(default=None, description="partial match by location"),
     page: int = Query(default=1),
@@ -291,65 +463,63 @@ async def get_worker_events(
     sort_by: str = Query(default="id", description="sort by field (id, timestamp, camera_name, location, error_detail, status)"),
     order: str = Query(default="desc", regex="^(asc|desc)$"),
     start_time: Optional[int] = Query(default=None),
-    end_time: Optional[int] = Query(default=None)
+    end_time: Optional[int] = Query(default=None),
+    cursor: Optional[str] = Query(default=None, description="keyset cursor (next_cursor của trang trước), thay cho page"),
+    count: str = Query(default="exact", regex=COUNT_MODE_PATTERN, description="cách đếm total: exact, estimated, cached, none"),
+    fields: Optional[str] = Query(default=None, description="chỉ lấy các cột này, vd fields=id,timestamp,location,status"),
 ):
     try:
-        stmt = select(WorkerEvent)
-
-        # Apply filters (áp dụng trước khi count và sort/paginate)
-        if query:
-            stmt = stmt.where(
-                (WorkerEvent.camera_id.ilike(f"%{query}%")) |
-                (WorkerEvent.camera_name.ilike(f"%{query}%"))
-            )
-        if status is not None:
-            stmt = stmt.where(WorkerEvent.status == status)
-        if event_id:  # Sửa ở đây: dùng cast chuẩn
-            stmt = stmt.where(cast(WorkerEvent.id, String).ilike(f"%{event_id}%"))
-        if error_code:
-            stmt = stmt.where(WorkerEvent.error_detail.ilike(f"%{error_code}%"))
-        if location:
-            stmt = stmt.where(WorkerEvent.location.ilike(f"%{location}%"))
-        if start_time:
-            stmt = stmt.where(
-                WorkerEvent.timestamp >= datetime.datetime.fromtimestamp(start_time, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-            )
-            print("start time: ",datetime.datetime.fromtimestamp(start_time, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
-        if end_time:
-            stmt = stmt.where(
-                WorkerEvent.timestamp <= datetime.datetime.fromtimestamp(end_time, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-            )
-            print("end time: ", datetime.datetime.fromtimestamp(end_time, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
-
-        # Count total (sử dụng subquery để inherit filters)
-        count_subquery = stmt.subquery()
-        count_stmt = select(func.count()).select_from(count_subquery)
-        total_result = await session.execute(count_stmt)
-        total = total_result.scalar() or 0
-
-        # Apply sorting (sau count, trước paginate)
+        # Sort field hợp lệ (cần biết trước để luôn SELECT cột sort khi có fields)
         valid_sort_fields = ['id', 'timestamp', 'camera_name', 'location', 'error_detail', 'status']
         actual_sort_by = sort_by if sort_by in valid_sort_fields else 'id'
-        if order == 'desc':
-            stmt = stmt.order_by(getattr(WorkerEvent, actual_sort_by).desc())
-        else:
-            stmt = stmt.order_by(getattr(WorkerEvent, actual_sort_by))
 
-        # Pagination (offset/limit trên stmt gốc, đã có filters/sort)
-        stmt = stmt.offset((page - 1) * size).limit(size)
-        result = await session.execute(stmt)
-        events = result.scalars().all()
+        # fields=...: SELECT đúng các cột cần thiết thay vì cả dòng
+        # Luôn SELECT cột (Core row) thay vì ORM instance: không hydrate object / identity map
+        columns = projected_columns(WorkerEvent, fields, required=("id", actual_sort_by)) or table_columns(WorkerEvent)
+        stmt = select(*columns)
 
-        total_pages = (total // size) + (1 if total % size else 0)
+        # Apply filters (áp dụng trước khi count và sort/paginate)
+        stmt = filter_worker_events(
+            stmt, query=query, status=status, event_id=event_id, error_code=error_code,
+            location=location, start_time=start_time, end_time=end_time,
+        )
 
-        return {
-            "total": total,
-            "current": page,
-            "size": size,
-            "page": total_pages,  # Đổi từ "page" thành "total_pages" nếu cần, nhưng giữ khớp response cũ
-            "data": [e.dict() for e in events]
-        }
+        async def load_page():
+            # Count total theo chiến lược count (subquery để inherit filters)
+            signature = ("worker-events", query, status, event_id, error_code, location, start_time, end_time)
+            total = await count_rows(session, stmt, count, signature)
+
+            # Apply sorting (sau count, trước paginate)
+            page_stmt = apply_keyset(stmt, WorkerEvent, actual_sort_by, order, cursor)
+
+            # Pagination: có cursor thì dùng keyset, không thì offset/limit như cũ
+            if not cursor:
+                page_stmt = page_stmt.offset((page - 1) * size)
+            # Lấy dư 1 dòng để biết còn trang sau hay không (không cần count)
+            page_stmt = page_stmt.limit(size + 1)
+            result = await session.execute(page_stmt)
+            events = result.all()
+            has_more = len(events) > size
+            events = events[:size]
+
+            total_pages = (total // size) + (1 if total % size else 0) if total is not None else None
+
+            return negotiated_response(request, {
+                "total": total,
+                "current": page,
+                "size": size,
+                "page": total_pages,  # Đổi từ "page" thành "total_pages" nếu cần, nhưng giữ khớp response cũ
+                "count_mode": count,
+                "has_more": has_more,
+                "next_cursor": next_cursor(events, actual_sort_by, order, size) if has_more else None,
+                "data": [with_evidence_urls(e._asdict()) for e in events]
+            })
+
+        # Dashboard poll cùng một trang liên tục: dùng response cache (TTL ngắn, gộp các miss đồng thời)
+        return await response_cache.get_or_compute(request, ("workerevent",), load_page)
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         # Thêm logging để debug (optional)
         import traceback
@@ -357,17 +527,54 @@ async def get_worker_events(
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error fetching worker_events: {str(e)}")
     
+@router.get("/worker-events/facets")
+async def get_worker_event_facets(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    query: Optional[str] = Query(default=None, description="search by camera_id or camera_name"),
+    status: Optional[int] = Query(default=None, description="filter by status (0=Pending, 1=OK, 2=NG)"),
+    event_id: Optional[str] = Query(default=None, description="exact or prefix match by event ID"),
+    error_code: Optional[str] = Query(default=None, description="partial match by error_detail"),
+    location: Optional[str] = Query(default=None, description="partial match by location"),
+    start_time: Optional[int] = Query(default=None),
+    end_time: Optional[int] = Query(default=None),
+    limit: int = Query(default=DEFAULT_FACET_LIMIT, ge=1, le=500, description="số giá trị tối đa mỗi facet"),
+):
+    """
+    Số worker event theo status, location, camera và error_detail cho bộ filter hiện tại
+    (cùng filter với GET /worker-events), trong một query GROUPING SETS.
+    Filter chỉ gồm status / location / error_code / start_time tròn giờ thì đọc bảng rollup theo giờ.
+    """
+    async def load_facets():
+        facets = await worker_event_facets(
+            session, limit=limit, query=query, status=status, event_id=event_id, error_code=error_code,
+            location=location, start_time=start_time, end_time=end_time,
+        )
+        return FastJSONResponse(facets)
+
+    try:
+        return await response_cache.get_or_compute(request, ("workerevent", "eventrollup"), load_facets)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching worker event facets: {str(e)}")
+
+
 @router.get("/locations")
-async def get_distinct_locations(session: AsyncSession = Depends(get_session)):
+async def get_distinct_locations(request: Request, session: AsyncSession = Depends(get_session)):
     """
     Trả danh sách location dạng [{label: 'B08 1F', value: 'B08 1F'}, ...]
+    Đọc từ filter_dictionary (RAM), chỉ query DB khi từ điển chưa được nạp.
+    ETag theo version của từ điển: If-None-Match khớp thì trả 304.
     """
     try:
-        result = await session.execute(select(distinct(WorkerEvent.location)))
-        rows = [row[0] for row in result.fetchall() if row[0]]
-        locations = [{"label": loc, "value": loc} for loc in rows]
-        print("locations:", locations)
-        return locations
+        if not filter_dictionary.ready:
+            await filter_dictionary.rebuild(session)
+        etag, not_modified = conditional_get(request, (), filter_dictionary.version)
+        if not_modified:
+            return not_modified
+        locations = [{"label": loc, "value": loc} for loc in filter_dictionary.values("worker_event", "location")]
+        return FastJSONResponse(locations, headers=etag_headers(etag))
     except Exception as e:
         import traceback
         print("Error in get_distinct_locations:", str(e))
@@ -375,6 +582,32 @@ async def get_distinct_locations(session: AsyncSession = Depends(get_session)):
         raise HTTPException(status_code=500, detail=f"Error fetching locations: {str(e)}")
 
 
+@router.get("/filter-options")
+async def get_filter_options(
+    request: Request,
+    source: str = Query("worker_event", regex="^(worker_event|alarm|error_detail)$"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Giá trị cho các dropdown filter của một loại event:
+    {locations: [...], camera_names: [...], error_codes: [...]} dạng [{label, value}, ...]
+    """
+    try:
+        if not filter_dictionary.ready:
+            await filter_dictionary.rebuild(session)
+        etag, not_modified = conditional_get(request, (), filter_dictionary.version)
+        if not_modified:
+            return not_modified
+        options = {
+            f"{kind}s": [{"label": value, "value": value} for value in filter_dictionary.values(source, kind)]
+            for kind in ("location", "camera_name", "error_code")
+        }
+        return FastJSONResponse(options, headers=etag_headers(etag))
+    except Exception as e:
+        print("Error in get_filter_options:", str(e))
+        raise HTTPException(status_code=500, detail=f"Error fetching filter options: {str(e)}")
+
+
 @router.get("/bbs/owner-stats")
 async def get_bbs_owner_stats():
     data = [
@@ -421,7 +654,8 @@ async def get_bbs_owner_stats():
 
 @router.post("/alarms")
 async def create_alarm(
-    camera_id: str = Form(...),
+    background_tasks: BackgroundTasks,
+    camera_id: int = Form(...),
     error_detail: str = Form(...),
     img_error: Union[UploadFile, None, str] = File(None),
     video_error: Union[UploadFile, None, str] = File(None),
@@ -433,15 +667,15 @@ async def create_alarm(
     """
     try:
         # 1. Lấy thông tin camera từ database
-        camera_query = select(CameraConfig).where(CameraConfig.id == int(camera_id))
+        camera_query = select(CameraConfig).where(CameraConfig.id == camera_id)
         camera_result = await session.execute(camera_query)
         camera = camera_result.scalars().first()
         
         if not camera:
             raise HTTPException(status_code=404, detail=f"Camera with id {camera_id} not found")
         
-        # 2. Tạo timestamp hiện tại
-        current_time = datetime.datetime.now()
+        # 2. Tạo timestamp hiện tại (có múi giờ, lưu vào cột timestamptz)
+        current_time = datetime.datetime.now().astimezone()
         timestamp_str = current_time.strftime('%Y-%m-%d %H:%M:%S')
         
         # 3. Tạo thư mục lưu trữ theo cấu trúc: static/alarms/YYYY-MM-DD/camera_id/
@@ -520,7 +754,7 @@ async def create_alarm(
             video_error=video_relative_path,
             ai_log_path=ai_log_relative_path,   # ✅ đúng tên field
             location=camera.location,
-            timestamp=timestamp_str,
+            timestamp=current_time,
             metadata_path=metadata_relative_path,
             camera_name=camera.name,            # ✅ thêm camera_name
             alarm_uuid=alarm_uuid,
@@ -528,9 +762,22 @@ async def create_alarm(
         )
 
         session.add(new_alarm)
+        await record_event(session, "alarm", new_alarm)
+        await record_usage(
+            session, "alarms", camera_id, current_time.date(),
+            *file_sizes([img_relative_path, video_relative_path, ai_log_relative_path, metadata_relative_path]),
+        )
         await session.commit()
+        table_versions.bump("alarm")
         await session.refresh(new_alarm)
 
+        unconfirmed_alarms.add(new_alarm)
+        filter_dictionary.add("alarm", location=camera.location, camera_name=camera.name, error_code=error_detail)
+
+        # Ảnh 360° rất lớn: tạo tile pyramid (DZI) ở background cho viewer zoom
+        if camera.panorama and img_relative_path:
+            background_tasks.add_task(generate_pyramid, img_relative_path)
+
         # 10. Response trả về đầy đủ thông tin
         return {
             "success": True,
@@ -544,10 +791,10 @@ async def create_alarm(
                 "timestamp": new_alarm.timestamp,
             },
             "files": {
-                "image_url": f"/{img_relative_path}" if img_relative_path else None,
-                "video_url": f"/{video_relative_path}" if video_relative_path else None,
-                "ai_log_url": f"/{ai_log_relative_path}" if ai_log_relative_path else None,
-                "metadata_url": f"/{metadata_relative_path}"
+                "image_url": versioned_url(img_relative_path),
+                "video_url": versioned_url(video_relative_path),
+                "ai_log_url": versioned_url(ai_log_relative_path),
+                "metadata_url": versioned_url(metadata_relative_path)
             },
             "storage_path": str(alarm_folder)
         }
@@ -561,20 +808,27 @@ async def create_alarm(
 @router.get("/cameras/{camera_config_id}")
 async def get_camera_by_id(
     camera_config_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_session),
 ):
     """
     API lấy thông tin camera theo ID (để FE có thể lấy name, location)
+    Hỗ trợ If-None-Match: camera/tag không đổi thì trả 304, không query DB.
+    Xoá camera bump version cameraconfig nên ETag cũ không bao giờ khớp với id đã xoá.
     """
     try:
-        query = select(CameraConfig).where(CameraConfig.id == camera_config_id)
+        etag, not_modified = conditional_get(request, ("cameraconfig", "tag"))
+        if not_modified:
+            return not_modified
+
+        query = select(CameraConfig).options(selectinload(CameraConfig.tags)).where(CameraConfig.id == camera_config_id)
         result = await session.execute(query)
         camera = result.scalars().first()
         
         if not camera:
             raise HTTPException(status_code=404, detail="Camera not found")
             
-        return {
+        return FastJSONResponse({
             "id": camera.id,
             "name": camera.name,
             "location": camera.location,
@@ -588,8 +842,10 @@ async def get_camera_by_id(
             "isGate": camera.isGate,
             "gate_disable_alarm_url": camera.gate_disable_alarm_url,
             "tags": [{"id": tag.id, "tag_name": tag.tag_name} for tag in camera.tags]
-        }
+        }, headers=etag_headers(etag))
         
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -620,9 +876,9 @@ async def get_alarm_files(
         return {
             "alarm_id": alarm.id,
             "files": {
-                "image": f"/{alarm.img_error}" if alarm.img_error else None,
-                "video": None,
-                "ai_log": None
+                "image": versioned_url(alarm.img_error),
+                "video": versioned_url(alarm.video_error),
+                "ai_log": versioned_url(alarm.ai_log_path)
             }
         }
         
@@ -636,19 +892,31 @@ async def get_unconfirmed_alarms(
     *,
     session: AsyncSession = Depends(get_session),
     limit: int = Query(default=100),
+    request: Request,
 ):
-    """Lấy danh sách tất cả các cảnh báo chưa được xác nhận."""
+    """
+    Lấy danh sách tất cả các cảnh báo chưa được xác nhận (đọc từ hot set trong RAM).
+    Hot set giữ sẵn dict của từng alarm nên response không phải dựng/validate lại model.
+    Body đã serialize được giữ trong response cache tới khi có alarm mới / được xác nhận.
+    """
+    async def load_alarms():
+        rows = unconfirmed_alarms.latest_rows(limit)
+        if rows is None:
+            # Hot set thiếu dữ liệu (đã xác nhận bớt khi tập bị cắt theo capacity): nạp lại một lần
+            await unconfirmed_alarms.seed(session)
+            rows = unconfirmed_alarms.latest_rows(limit)
+        if rows is None:
+            query = select(*table_columns(Alarm)).where(
+                Alarm.is_confirmed == False
+            ).order_by(
+                Alarm.timestamp.desc(), Alarm.id.desc()
+            ).limit(limit)
+            result = await session.execute(query)
+            rows = [with_evidence_urls(dict(row)) for row in result.mappings()]
+        return FastJSONResponse(rows)
+
     try:
-        query = select(Alarm).where(
-            Alarm.is_confirmed == False
-        ).order_by(
-            Alarm.timestamp.desc()
-        ).limit(limit)
-        
-        result = await session.execute(query)
-        alarms = result.scalars().all()
-        
-        return alarms
+        return await response_cache.get_or_compute(request, ("alarm",), load_alarms)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -664,10 +932,14 @@ async def get_latest_alarm_and_status(
     Lấy cảnh báo mới nhất chưa được xác nhận.
     """
     try:
+        alarms = unconfirmed_alarms.latest(1)
+        if alarms is not None:
+            return model_response(Optional[Alarm], alarms[0] if alarms else None)
+
         query = select(Alarm).where(
             Alarm.is_confirmed == False
         ).order_by(
-            Alarm.timestamp.desc()
+            Alarm.timestamp.desc(), Alarm.id.desc()
         ).limit(1)
         
         result = await session.execute(query)
@@ -705,8 +977,10 @@ async def confirm_alarm_by_id(
             raise HTTPException(status_code=404, detail="Alarm not found")
         
         # Cập nhật trạng thái của alarm
+        old_status = 1 if alarm.is_confirmed else 0
         alarm.is_confirmed = True
         session.add(alarm)
+        await record_status_change(session, "alarm", alarm, old_status)
 
         # Lấy IP từ request headers (cách tốt hơn)
         # client_ip = request_data.client_ip or "Unknown" # Sử dụng IP gửi từ FE
@@ -725,8 +999,10 @@ async def confirm_alarm_by_id(
         session.add(new_log)
 
         await session.commit()
+        table_versions.bump("alarm")
         await session.refresh(alarm)
         await session.refresh(new_log)
+        unconfirmed_alarms.discard(alarm_id)
 
         return {
             "message": "Alarm confirmed and logged successfully", 
@@ -740,24 +1016,87 @@ async def confirm_alarm_by_id(
         raise HTTPException(status_code=500, detail=str(e))
     
     
+@router.patch("/alarms/bulk-confirm")
+async def bulk_confirm_alarms(
+    *,
+    session: AsyncSession = Depends(get_session),
+    request_data: AlarmBulkConfirmRequest,
+    request: Request
+):
+    """
+    Xác nhận hàng loạt cảnh báo theo ids và/hoặc filters (vd dọn alarm sai sau khi dừng chuyền).
+    Một UPDATE ... RETURNING cho các alarm chưa xác nhận, một INSERT nhiều dòng cho log, commit một lần.
+    skipped_ids: id không tồn tại, không khớp filter hoặc đã được xác nhận từ trước.
+    """
+    try:
+        stmt = (
+            update(Alarm)
+            .where(Alarm.is_confirmed == False)
+            .values(is_confirmed=True)
+            .returning(Alarm.id, Alarm.timestamp, Alarm.camera_id, Alarm.location, Alarm.error_detail)
+            .execution_options(synchronize_session=False)
+        )
+        stmt = _bulk_selection(stmt, Alarm.id, request_data.ids, request_data.filters, filter_alarms)
+        rows = (await session.execute(stmt)).all()
+        if rows:
+            client_ip = request.client.host
+            logged_at = datetime.datetime.now()
+            await session.execute(insert(AlarmConfirmationLog), [
+                {
+                    "alarm_id": row.id, "employee_confirm_id": request_data.employee_confirm_id,
+                    "client_ip": client_ip, "logged_at": logged_at,
+                }
+                for row in rows
+            ])
+            await record_status_changes(session, "alarm", [(row, 0, 1) for row in rows])
+        await session.commit()
+
+        updated_ids = sorted(row.id for row in rows)
+        if rows:
+            table_versions.bump("alarm")
+            for alarm_id in updated_ids:
+                unconfirmed_alarms.discard(alarm_id)
+        summary = {"message": "Alarms confirmed and logged successfully", "updated": len(updated_ids), "ids": updated_ids}
+        if request_data.ids:
+            summary["skipped_ids"] = sorted(set(request_data.ids) - set(updated_ids))
+        return summary
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/alarms", response_model=list[Alarm])
 async def get_alarms(
     *,
     session: AsyncSession = Depends(get_session),
     offset: int = 0,
     limit: int = Query(default=100),
-    camera_id: Optional[str] = Query(default=None),
+    camera_id: Optional[int] = Query(default=None),
+    cursor: Optional[str] = Query(default=None, description="keyset cursor lấy từ header X-Next-Cursor, thay cho offset"),
+    fields: Optional[str] = Query(default=None, description="chỉ lấy các cột này, vd fields=id,timestamp,error_detail"),
+    request: Request,
 ):
     """
     Lấy danh sách cảnh báo, có thể lọc theo camera_id.
+    Cursor của trang kế tiếp trả về trong header X-Next-Cursor.
+    fields=... chỉ lấy các cột được chọn; Accept: application/msgpack trả MessagePack.
+    Đọc row bằng Core và serialize thẳng (response_model chỉ dùng cho tài liệu OpenAPI).
     """
     try:
-        query = select(Alarm)
-        if camera_id:
-            query = query.where(Alarm.camera_id == camera_id)
-        alarms = await session.execute(query.order_by(Alarm.id.asc()).offset(offset).limit(limit))
-        alarms = alarms.scalars().all()
-        return alarms
+        columns = projected_columns(Alarm, fields) or table_columns(Alarm)
+        query = filter_alarms(select(*columns), camera_id=camera_id)
+        query = apply_keyset(query, Alarm, "id", "asc", cursor)
+        if not cursor:
+            query = query.offset(offset)
+        alarms = await session.execute(query.limit(limit))
+        alarms = alarms.all()
+        cursor_next = next_cursor(alarms, "id", "asc", limit)
+        headers = {"X-Next-Cursor": cursor_next} if cursor_next else None
+        return negotiated_response(request, [with_evidence_urls(alarm._asdict()) for alarm in alarms], headers=headers)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -810,9 +1149,56 @@ async def create_camera_config(
         session.add(CameraConfigTagLink(camera_config_id=db_camera_config.id, tag_id=tag.id))
 
     await session.commit()
-    await session.refresh(db_camera_config)
+    table_versions.bump("cameraconfig")
+    tag_index.set_camera_tags(db_camera_config.id, [tag.id for tag in existing_tags])
+    # Response cần tags: load lại kèm selectinload (relationship không còn eager mặc định)
+    result = await session.execute(
+        select(CameraConfig).options(selectinload(CameraConfig.tags)).where(CameraConfig.id == db_camera_config.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().one()
 
-    return db_camera_config
+@router.post("/import")
+async def import_camera_configs(
+    *,
+    session: AsyncSession = Depends(get_session),
+    user: Annotated[UserPublic, Depends(get_current_user)],
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(default=None, alias="format", regex="^(json|csv)$", description="mặc định theo đuôi file"),
+    create_missing_tags: bool = Query(default=False),
+    dry_run: bool = Query(default=False),
+):
+    """
+    Import camera hàng loạt từ file JSON (list object) hoặc CSV (như file của GET /v1/export/cameras).
+    Dòng có id: cập nhật camera đó; không có id: khớp theo name, chưa có thì tạo mới.
+    Cột / trường tags (tên tag, CSV ngăn bằng "|") thay toàn bộ tag của camera; bỏ trống trường thì giữ tag cũ.
+    Toàn bộ dòng hợp lệ được ghi trong một transaction; trả báo cáo từng dòng (dòng lỗi bị bỏ qua).
+    """
+    if not hasattr(user, 'config') or not user.config:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if file_format is None:
+        file_format = "csv" if (file.filename or "").lower().endswith(".csv") else "json"
+    try:
+        rows = parse_import_file(await file.read(), file_format)
+        report, camera_tags, tags_changed = await import_cameras(
+            session, rows, create_missing_tags=create_missing_tags, dry_run=dry_run
+        )
+        summary = report["summary"]
+        # Chỉ đổi version khi có dòng thực sự được ghi (không tính dry_run / file toàn dòng lỗi)
+        if not dry_run and summary["created"] + summary["updated"] > 0:
+            table_versions.bump("cameraconfig")
+            if tags_changed:
+                table_versions.bump("tag")
+            for camera_id, tag_ids in camera_tags.items():
+                tag_index.set_camera_tags(camera_id, tag_ids)
+        return report
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Error importing camera configs: {str(e)}")
 
 # @router.get("/", response_model=list[CameraConfigPublicWithTags])
 # def read_camera_configs(*, session: Session = Depends(get_session), offset: int = 0, limit: int = Query(default=100), user: Annotated[str, Depends(get_current_user)], tag_ids: list[int] = Query(default=None)):
@@ -836,6 +1222,7 @@ async def read_camera_configs(
     name: Optional[str] = Query(default=None),
     location: Optional[str] = Query(default=None),
     panorama: Optional[int] = Query(default=None),
+    request: Request,
 ):
     """
     Retrieve a list of camera configurations with associated tags.
@@ -860,41 +1247,71 @@ async def read_camera_configs(
 
     Raises:
     - HTTPException: If the user is not authorized or if there are any issues with the query.
+
+    Responses carry a strong ETag derived from the cameraconfig/tag versions; a matching
+    If-None-Match returns 304 without running the camera query.
     """
 
     # if not hasattr(user, 'config') or not user.config:
     #     raise HTTPException(status_code=403, detail="Forbidden")
     
-    query = select(CameraConfig)
+    etag, not_modified = conditional_get(request, ("cameraconfig", "tag"))
+    if not_modified:
+        return not_modified
+
+    async def load_camera_configs():
+        query = select(CameraConfig)
     
-    if tag_ids:
-        for tag_id in tag_ids:
-            query = query.where(
-                CameraConfig.id.in_(
+        if tag_ids:
+            # Giao các tag trên inverted index trong RAM; index chưa sẵn sàng thì một GROUP BY ... HAVING
+            camera_ids = tag_index.camera_ids(tag_ids)
+            if camera_ids is None:
+                wanted = set(tag_ids)
+                camera_ids = (
                     select(CameraConfigTagLink.camera_config_id)
-                    .where(CameraConfigTagLink.tag_id == tag_id)
+                    .where(CameraConfigTagLink.tag_id.in_(wanted))
+                    .group_by(CameraConfigTagLink.camera_config_id)
+                    .having(func.count(CameraConfigTagLink.tag_id) == len(wanted))
                 )
-            )
+            elif not camera_ids:
+                return FastJSONResponse([], headers=etag_headers(etag))
+            query = query.where(CameraConfig.id.in_(camera_ids))
     
-    if name:
-        query = query.where(CameraConfig.name.contains(name))
+        if name:
+            query = query.where(CameraConfig.name.contains(name))
     
-    if location:
-        query = query.where(CameraConfig.location.contains(location))
+        if location:
+            query = query.where(CameraConfig.location.contains(location))
     
-    if panorama is not None:
-        query = query.where(CameraConfig.panorama == panorama)
+        if panorama is not None:
+            query = query.where(CameraConfig.panorama == panorama)
     
-    camera_configs = await session.execute(query.order_by(CameraConfig.id.asc()).offset(offset).limit(limit))
-    camera_configs = camera_configs.scalars().all()
-    return camera_configs
+        # Đọc bằng Core: một query cho camera, một query cho tag của các camera đó, ghép thành dict
+        query = query.with_only_columns(*table_columns(CameraConfig))
+        camera_configs = await session.execute(query.order_by(CameraConfig.id.asc()).offset(offset).limit(limit))
+        camera_configs = [dict(row) for row in camera_configs.mappings()]
+        tags_by_camera = {camera["id"]: [] for camera in camera_configs}
+        if tags_by_camera:
+            tag_rows = await session.execute(
+                select(CameraConfigTagLink.camera_config_id, Tag.id, Tag.tag_name)
+                .join(Tag, Tag.id == CameraConfigTagLink.tag_id)
+                .where(CameraConfigTagLink.camera_config_id.in_(list(tags_by_camera)))
+                .order_by(Tag.id)
+            )
+            for camera_id, tag_id, tag_name in tag_rows.all():
+                tags_by_camera[camera_id].append({"tag_name": tag_name, "id": tag_id})
+        for camera in camera_configs:
+            camera["tags"] = tags_by_camera[camera["id"]]
+        return FastJSONResponse(camera_configs, headers=etag_headers(etag))
+
+    return await response_cache.get_or_compute(request, ("cameraconfig", "tag"), load_camera_configs)
 
 
 
 
 @router.get("/{camera_config_id}", response_model=CameraConfigPublicWithTags)
 async def read_camera_config(*, session: AsyncSession = Depends(get_session), user: Annotated[UserPublic, Depends(get_current_user)], camera_config_id: int):
-    camera_config = await session.get(CameraConfig, camera_config_id)
+    camera_config = await session.get(CameraConfig, camera_config_id, options=[selectinload(CameraConfig.tags)])
     if not camera_config:
         raise HTTPException(status_code=404, detail="CameraConfig not found")
     return camera_config
@@ -910,7 +1327,8 @@ async def update_camera_config(*, user: Annotated[UserPublic, Depends(get_curren
     camera_config_data = camera_config.dict(exclude_unset=True)
     
     await session.execute(delete(CameraConfigTagLink).where(CameraConfigTagLink.camera_config_id == camera_config_id))
-    for tag_id in camera_config_data.pop("tag_ids", []):
+    new_tag_ids = camera_config_data.pop("tag_ids", None) or []
+    for tag_id in new_tag_ids:
         tag = await session.get(Tag, tag_id)
         if not tag:
             raise HTTPException(status_code=404, detail="Tag not found")
@@ -922,6 +1340,8 @@ async def update_camera_config(*, user: Annotated[UserPublic, Depends(get_curren
         setattr(db_camera_config, key, value)
     session.add(db_camera_config)
     await session.commit()
+    table_versions.bump("cameraconfig")
+    tag_index.set_camera_tags(camera_config_id, new_tag_ids)
     await session.refresh(db_camera_config)
     return db_camera_config
 
@@ -934,5 +1354,10 @@ async def delete_camera_config(*, session: AsyncSession = Depends(get_session),
     if not db_camera_config:
         raise HTTPException(status_code=404, detail="CameraConfig not found")
     await session.delete(db_camera_config)
+    await detach_camera(session, camera_config_id)
     await session.commit()
+    # Alarm / worker event của camera bị SET NULL camera_id
+    table_versions.bump("cameraconfig", "alarm", "workerevent")
+    tag_index.remove_camera(camera_config_id)
+    await unconfirmed_alarms.seed(session)
     return {"ok": True}
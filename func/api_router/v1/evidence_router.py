@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import os
+from typing import Dict
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from func.alarm_hot_set import unconfirmed_alarms
+from func.media.panorama import quantize_view, render_perspective
+from func.media.sprite_sheet import build_sprite_sheet, sprite_version
+from func.media.tile_pyramid import TILE_OVERLAP, TILE_SIZE, generate_pyramid, is_pyramid_pending, is_pyramid_ready, pyramid_paths
+from func.static_router.v1.evidence_static import evidence_version, versioned_url
+from model.db_model import Alarm, CameraConfig, get_session
+
+router = APIRouter(prefix="/v1/evidence", tags=["evidence"])
+
+# Gộp các request tạo cùng một sprite đang chạy song song
+_sprite_inflight: Dict[str, asyncio.Future] = {}
+
+
+@router.get("/alarms/unconfirmed/sprite")
+async def get_unconfirmed_alarm_sprite(
+    *,
+    session: AsyncSession = Depends(get_session),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=200),
+    tile_width: int = Query(default=160, ge=16, le=512),
+    tile_height: int = Query(default=120, ge=16, le=512),
+    columns: int = Query(default=10, ge=1, le=50),
+):
+    """
+    Ghép thumbnail của một trang alarm chưa xác nhận thành 1 ảnh sprite + bảng toạ độ.
+    Cùng thứ tự với /v1/cameras/alarms/unconfirmed, FE chỉ cần 1 request ảnh cho cả lưới.
+    """
+    try:
+        alarms = unconfirmed_alarms.latest(limit, offset)
+        if alarms is not None:
+            items = [(alarm.id, alarm.img_error) for alarm in alarms]
+        else:
+            query = select(Alarm.id, Alarm.img_error).where(
+                Alarm.is_confirmed == False
+            ).order_by(
+                Alarm.timestamp.desc(), Alarm.id.desc()
+            ).offset(offset).limit(limit)
+            result = await session.execute(query)
+            items = [(row.id, row.img_error) for row in result.all()]
+
+        version = sprite_version(items, tile_width, tile_height, columns)
+        future = _sprite_inflight.get(version)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, build_sprite_sheet, items, tile_width, tile_height, columns)
+            _sprite_inflight[version] = future
+            future.add_done_callback(lambda _: _sprite_inflight.pop(version, None))
+        return await asyncio.shield(future)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building alarm sprite: {str(e)}")
+
+
+async def _get_panorama_alarm(session: AsyncSession, alarm_id: int) -> Alarm:
+    """Lấy alarm có ảnh từ camera panorama, raise 404/400 nếu không hợp lệ."""
+    alarm = await session.get(Alarm, alarm_id)
+    if not alarm:
+        raise HTTPException(status_code=404, detail="Alarm not found")
+    if not alarm.img_error or not os.path.exists(alarm.img_error):
+        raise HTTPException(status_code=404, detail="Alarm image not found")
+    camera = await session.get(CameraConfig, alarm.camera_id) if alarm.camera_id is not None else None
+    if not camera or not camera.panorama:
+        raise HTTPException(status_code=400, detail="Alarm camera is not a panorama camera")
+    return alarm
+
+
+@router.get("/alarms/{alarm_id}/perspective")
+async def get_alarm_perspective_view(
+    *,
+    session: AsyncSession = Depends(get_session),
+    alarm_id: int,
+    request: Request,
+    yaw: float = Query(default=0.0, description="góc ngang (độ), 0 = giữa ảnh"),
+    pitch: float = Query(default=0.0, description="góc dọc (độ), dương = nhìn lên"),
+    fov: float = Query(default=90.0, description="góc nhìn ngang (độ)"),
+    width: int = Query(default=960, ge=64, le=3840),
+    height: int = Query(default=540, ge=64, le=2160),
+):
+    """
+    Render view perspective từ ảnh 360° (equirectangular) của alarm trên server,
+    thin client chỉ phải tải một ảnh JPEG nhỏ thay vì cả panorama.
+    """
+    try:
+        alarm = await _get_panorama_alarm(session, alarm_id)
+        yaw, pitch, fov = quantize_view(yaw, pitch, fov)
+
+        source_version = evidence_version(alarm.img_error, os.stat(alarm.img_error))
+        view_key = f"{source_version}:{yaw}:{pitch}:{fov}:{width}x{height}"
+        etag = f'"{hashlib.blake2b(view_key.encode(), digest_size=8).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+        if etag in [tag.strip(" W/") for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(
+            None, render_perspective, alarm.img_error, yaw, pitch, fov, width, height
+        )
+        return Response(content=content, media_type="image/jpeg", headers=headers)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rendering perspective view: {str(e)}")
+
+
+@router.get("/alarms/{alarm_id}/dzi")
+async def get_alarm_deep_zoom(
+    *,
+    session: AsyncSession = Depends(get_session),
+    alarm_id: int,
+    response: Response,
+    background_tasks: BackgroundTasks,
+):
+    """
+    Trả về URL descriptor Deep Zoom (.dzi) của ảnh 360° để viewer (OpenSeadragon...) chỉ tải các tile đang hiển thị.
+    Nếu pyramid chưa có thì lên lịch tạo ở background và trả 202 "pending".
+    """
+    try:
+        alarm = await _get_panorama_alarm(session, alarm_id)
+        if is_pyramid_ready(alarm.img_error):
+            dzi_path, _ = pyramid_paths(alarm.img_error)
+            return {
+                "status": "ready",
+                "alarm_id": alarm.id,
+                "dzi_url": versioned_url(dzi_path),
+                "tile_size": TILE_SIZE,
+                "overlap": TILE_OVERLAP,
+            }
+        if not is_pyramid_pending(alarm.img_error):
+            background_tasks.add_task(generate_pyramid, alarm.img_error)
+        response.status_code = 202
+        return {"status": "pending", "alarm_id": alarm.id}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error preparing deep zoom image: {str(e)}")
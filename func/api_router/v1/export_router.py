@@ -0,0 +1,94 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from func.auth.v1.auth import get_current_user
+from func.camera_bulk import BULK_MEDIA_TYPES, cameras_to_csv, export_cameras
+from func.event_filters import filter_alarms, filter_worker_events
+from func.export_stream import EXPORT_MEDIA_TYPES, csv_chunks, export_filename, parquet_available, parquet_chunks
+from func.fast_json import FastJSONResponse
+from model.db_model import Alarm, UserPublic, WorkerEvent, get_session
+
+router = APIRouter(prefix="/v1/export", tags=["export"])
+
+FORMAT_PATTERN = "^(csv|parquet)$"
+
+
+def _export_response(stmt, columns, file_format: str, prefix: str) -> StreamingResponse:
+    if file_format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed")
+    chunks = parquet_chunks(stmt, columns) if file_format == "parquet" else csv_chunks(stmt, columns)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(prefix, file_format)}"'},
+    )
+
+
+@router.get("/worker-events")
+async def export_worker_events(
+    user: Annotated[UserPublic, Depends(get_current_user)],
+    file_format: str = Query(default="csv", alias="format", regex=FORMAT_PATTERN),
+    query: Optional[str] = Query(default=None, description="search by camera_id or camera_name"),
+    status: Optional[int] = Query(default=None, description="filter by status (0=Pending, 1=OK, 2=NG)"),
+    event_id: Optional[str] = Query(default=None, description="exact or prefix match by event ID"),
+    error_code: Optional[str] = Query(default=None, description="partial match by error_detail"),
+    location: Optional[str] = Query(default=None, description="partial match by location"),
+    order: str = Query(default="asc", regex="^(asc|desc)$"),
+    start_time: Optional[int] = Query(default=None),
+    end_time: Optional[int] = Query(default=None),
+):
+    """
+    Export toàn bộ worker event khớp filter (giống /v1/cameras/worker-events) ra CSV hoặc Parquet.
+    Dữ liệu được đọc theo lô qua server-side cursor và stream thẳng ra response,
+    bộ nhớ không phụ thuộc số dòng export.
+    """
+    columns = list(WorkerEvent.__table__.columns)
+    stmt = filter_worker_events(
+        select(*columns), query=query, status=status, event_id=event_id, error_code=error_code,
+        location=location, start_time=start_time, end_time=end_time,
+    )
+    stmt = stmt.order_by(WorkerEvent.id.desc() if order == "desc" else WorkerEvent.id.asc())
+    return _export_response(stmt, columns, file_format, "worker-events")
+
+
+@router.get("/alarms")
+async def export_alarms(
+    user: Annotated[UserPublic, Depends(get_current_user)],
+    file_format: str = Query(default="csv", alias="format", regex=FORMAT_PATTERN),
+    camera_id: Optional[int] = Query(default=None),
+    is_confirmed: Optional[bool] = Query(default=None),
+    error_code: Optional[str] = Query(default=None, description="partial match by error_detail"),
+    location: Optional[str] = Query(default=None, description="partial match by location"),
+    order: str = Query(default="asc", regex="^(asc|desc)$"),
+    start_time: Optional[int] = Query(default=None),
+    end_time: Optional[int] = Query(default=None),
+):
+    """Export alarm khớp filter ra CSV hoặc Parquet (stream theo lô như export worker event)."""
+    columns = list(Alarm.__table__.columns)
+    stmt = filter_alarms(
+        select(*columns), camera_id=camera_id, is_confirmed=is_confirmed, error_code=error_code,
+        location=location, start_time=start_time, end_time=end_time,
+    )
+    stmt = stmt.order_by(Alarm.id.desc() if order == "desc" else Alarm.id.asc())
+    return _export_response(stmt, columns, file_format, "alarms")
+
+
+@router.get("/cameras")
+async def export_camera_configs(
+    user: Annotated[UserPublic, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_session),
+    file_format: str = Query(default="json", alias="format", regex="^(json|csv)$"),
+):
+    """
+    Export toàn bộ cấu hình camera kèm tên tag, dùng lại được cho POST /v1/cameras/import
+    (vd chép cấu hình sang toà nhà / môi trường khác).
+    """
+    cameras = await export_cameras(session)
+    headers = {"Content-Disposition": f'attachment; filename="{export_filename("cameras", file_format)}"'}
+    if file_format == "csv":
+        return Response(cameras_to_csv(cameras), media_type=BULK_MEDIA_TYPES["csv"], headers=headers)
+    return FastJSONResponse(cameras, headers=headers)
@@ -13,6 +13,7 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config import Config
+from func.fast_json import send_json
 
 try:
     import pynvml # type: ignore
@@ -197,7 +198,7 @@ async def websocket_sysinfo_endpoint(websocket: WebSocket):
     try:
         while True:
             sys_info = await get_system_info()  # Gọi async non-blocking
-            await websocket.send_json(sys_info)
+            await send_json(websocket, sys_info)
             await asyncio.sleep(2)
     except WebSocketDisconnect:
         print("Client disconnected from /sys/info.")
@@ -227,7 +228,7 @@ async def websocket_camera_status_endpoint(websocket: WebSocket):
         while True:
             loop = asyncio.get_running_loop()
             camera_status = await loop.run_in_executor(executor, get_camera_status_info)
-            await websocket.send_json(camera_status)
+            await send_json(websocket, camera_status)
             await asyncio.sleep(5)  # Update mỗi 5 giây
     except WebSocketDisconnect:
         print("Client disconnected from /sys/camera-status.")
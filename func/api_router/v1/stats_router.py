@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+from typing import Annotated, List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from func.auth.v1.auth import get_current_user
+from func.event_rollup import rebuild_rollups
+from func.response_cache import response_cache
+from model.db_model import EventRollup, UserPublic, get_session
+
+router = APIRouter(prefix="/v1/stats", tags=["stats"])
+
+GROUP_FIELDS = {
+    "camera_id": EventRollup.camera_id,
+    "location": EventRollup.location,
+    "error_detail": EventRollup.error_detail,
+    "status": EventRollup.status,
+}
+
+
+@router.get("/events")
+async def get_event_stats(
+    *,
+    session: AsyncSession = Depends(get_session),
+    source: str = Query(default="alarm", regex="^(alarm|worker_event)$"),
+    bucket: str = Query(default="day", regex="^(hour|day|week|month)$", description="hour, day, week, month"),
+    start_time: Optional[datetime.datetime] = Query(default=None),
+    end_time: Optional[datetime.datetime] = Query(default=None),
+    camera_id: Optional[str] = Query(default=None),
+    location: Optional[str] = Query(default=None),
+    error_detail: Optional[str] = Query(default=None),
+    status: Optional[int] = Query(default=None),
+    group_by: List[str] = Query(default=[], description="camera_id, location, error_detail, status"),
+):
+    """
+    Số event theo khoảng thời gian (bucket) và các chiều group_by, chỉ đọc bảng rollup theo giờ.
+    Dashboard tuần / tháng chỉ quét vài nghìn dòng rollup thay vì toàn bộ alarm / workerevent.
+    start_time / end_time được làm tròn theo giờ (độ mịn của rollup).
+    """
+    try:
+        group_columns = [GROUP_FIELDS[field].label(field) for field in group_by if field in GROUP_FIELDS]
+        bucket_column = func.date_trunc(bucket, EventRollup.hour).label("bucket")
+        total = func.sum(EventRollup.event_count)
+        query = select(bucket_column, *group_columns, total.label("count")).where(EventRollup.source == source)
+        if start_time:
+            query = query.where(EventRollup.hour >= start_time.replace(minute=0, second=0, microsecond=0))
+        if end_time:
+            query = query.where(EventRollup.hour <= end_time)
+        if camera_id is not None:
+            query = query.where(EventRollup.camera_id == camera_id)
+        if location is not None:
+            query = query.where(EventRollup.location == location)
+        if error_detail is not None:
+            query = query.where(EventRollup.error_detail == error_detail)
+        if status is not None:
+            query = query.where(EventRollup.status == status)
+        query = query.group_by(bucket_column, *group_columns).having(total > 0).order_by(bucket_column)
+
+        result = await session.execute(query)
+        return [{**row._asdict(), "count": int(row.count)} for row in result.all()]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching event stats: {str(e)}")
+
+
+_rebuild_lock = asyncio.Lock()
+
+
+async def _rebuild_in_background():
+    async with _rebuild_lock:
+        try:
+            result = await rebuild_rollups()
+            print(f"Event rollups rebuilt: {result}")
+        except Exception as e:
+            print(f"Error rebuilding event stats: {e}")
+
+
+@router.post("/rebuild", status_code=202)
+async def rebuild_event_stats(
+    user: Annotated[UserPublic, Depends(get_current_user)],
+    background_tasks: BackgroundTasks,
+    response: Response,
+):
+    """
+    Lên lịch tính lại bảng rollup từ alarm / workerevent (sửa sai lệch sau khi sửa tay dữ liệu).
+    Chạy ở background, không giữ request; đang có lần rebuild khác chạy thì không lên lịch thêm.
+    """
+    if not hasattr(user, 'config') or not user.config:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if _rebuild_lock.locked():
+        response.status_code = 409
+        return {"status": "running"}
+    background_tasks.add_task(_rebuild_in_background)
+    return {"status": "scheduled"}
+
+
+@router.get("/response-cache")
+async def get_response_cache_stats(
+    user: Annotated[UserPublic, Depends(get_current_user)],
+):
+    """Số liệu response cache: hit rate, số request được gộp (coalesced), số entry và bộ nhớ đang dùng."""
+    return response_cache.stats()
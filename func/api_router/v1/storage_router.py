@@ -0,0 +1,70 @@
+import datetime
+from typing import Annotated, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from func.auth.v1.auth import get_current_user
+from func.storage_usage import reconcile_storage_usage
+from model.db_model import StorageUsage, UserPublic, get_session
+
+router = APIRouter(prefix="/v1/storage", tags=["storage"])
+
+GROUP_FIELDS = {
+    "camera_id": StorageUsage.camera_id,
+    "category": StorageUsage.category,
+    "day": StorageUsage.day,
+}
+
+
+@router.get("/usage")
+async def get_storage_usage(
+    *,
+    session: AsyncSession = Depends(get_session),
+    start_day: Optional[datetime.date] = Query(default=None),
+    end_day: Optional[datetime.date] = Query(default=None),
+    camera_id: Optional[str] = Query(default=None),
+    category: Optional[str] = Query(default=None, description="alarms | worker-events | error-detail"),
+    group_by: List[str] = Query(default=["camera_id", "category", "day"], description="camera_id, category, day"),
+):
+    """
+    Dung lượng lưu trữ (bytes, số file) theo camera / loại / ngày, đọc từ bảng đếm sẵn thay vì quét đĩa.
+    """
+    try:
+        group_columns = [GROUP_FIELDS[field] for field in group_by if field in GROUP_FIELDS]
+        query = select(
+            *group_columns,
+            func.sum(StorageUsage.total_bytes).label("total_bytes"),
+            func.sum(StorageUsage.file_count).label("file_count"),
+        )
+        if start_day:
+            query = query.where(StorageUsage.day >= start_day)
+        if end_day:
+            query = query.where(StorageUsage.day <= end_day)
+        if camera_id is not None:
+            query = query.where(StorageUsage.camera_id == camera_id)
+        if category:
+            query = query.where(StorageUsage.category == category)
+        if group_columns:
+            query = query.group_by(*group_columns).order_by(func.sum(StorageUsage.total_bytes).desc())
+
+        result = await session.execute(query)
+        return [
+            {**row._asdict(), "total_bytes": int(row.total_bytes or 0), "file_count": int(row.file_count or 0)}
+            for row in result.all()
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching storage usage: {str(e)}")
+
+
+@router.post("/reconcile")
+async def reconcile_storage(user: Annotated[UserPublic, Depends(get_current_user)]):
+    """Quét lại thư mục static và ghi đè bảng đếm dung lượng (sửa sai lệch)."""
+    if not hasattr(user, 'config') or not user.config:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    try:
+        return await reconcile_storage_usage()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reconciling storage usage: {str(e)}")
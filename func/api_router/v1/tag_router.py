@@ -1,13 +1,25 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import select
 from func.auth.v1.auth import get_current_user
+from func.table_version import conditional_get, etag_headers, table_versions
+from func.tag_index import tag_index
 from model.db_model import Tag, TagCreate, TagPublic, TagUpdate, TagPublicWithCameraConfigs, UserPublic, get_session
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 router = APIRouter(prefix="/v1/tags",tags=["tags"])
 
 
+async def load_tag_with_cameras(session: AsyncSession, tag_id: int) -> Tag:
+    """Tag kèm camera_configs (một câu selectinload, không load tiếp tags của từng camera)."""
+    result = await session.execute(
+        select(Tag).options(selectinload(Tag.camera_configs)).where(Tag.id == tag_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().one()
+
+
 @router.post("/", response_model=TagPublicWithCameraConfigs)
 async def create_tag(*, session: AsyncSession = Depends(get_session), tag: TagCreate, user: UserPublic= Depends(get_current_user)):
     if hasattr(user, 'config') and user.config == False:
@@ -15,14 +27,14 @@ async def create_tag(*, session: AsyncSession = Depends(get_session), tag: TagCr
     db_tag = Tag(**tag.dict())
     session.add(db_tag)
     await session.commit()
-    await session.refresh(db_tag)
-    return db_tag
+    table_versions.bump("tag")
+    return await load_tag_with_cameras(session, db_tag.id)
 
 
 @router.get("/{tag_id}", response_model=TagPublicWithCameraConfigs)
 async def read_tag(*, session: AsyncSession = Depends(get_session), tag_id: int, user: UserPublic= Depends(get_current_user)
              ):
-    tag = await session.get(Tag, tag_id)
+    tag = await session.get(Tag, tag_id, options=[selectinload(Tag.camera_configs)])
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     return tag
@@ -30,8 +42,14 @@ async def read_tag(*, session: AsyncSession = Depends(get_session), tag_id: int,
 
 @router.get("/", response_model=list[TagPublic])
 async def read_tags(
-    *, session: AsyncSession = Depends(get_session), offset: int = 0, limit: int = Query(default=100, le=100), tag_name: Optional[str] = Query(default=None), user: UserPublic= Depends(get_current_user)
+    *, session: AsyncSession = Depends(get_session), offset: int = 0, limit: int = Query(default=100, le=100), tag_name: Optional[str] = Query(default=None), user: UserPublic= Depends(get_current_user),
+    request: Request, response: Response
 ):
+    # ETag theo version bảng tag: If-None-Match khớp thì trả 304, không query
+    etag, not_modified = conditional_get(request, ("tag",))
+    if not_modified:
+        return not_modified
+    response.headers.update(etag_headers(etag))
     query = select(Tag)
     if tag_name:
         query = query.where(Tag.tag_name.contains(tag_name))
@@ -54,8 +72,9 @@ async def update_tag(
         setattr(db_tag, key, value)
     session.add(db_tag)
     await session.commit()
-    await session.refresh(db_tag)
-    return db_tag
+    # Tên tag nằm trong response của camera nên camera cũng đổi version
+    table_versions.bump("tag", "cameraconfig")
+    return await load_tag_with_cameras(session, tag_id)
 
 
 @router.delete("/{tag_id}")
@@ -69,4 +88,6 @@ async def delete_tag(
         raise HTTPException(status_code=404, detail="Tag not found")
     await session.delete(tag)
     await session.commit()
+    table_versions.bump("tag", "cameraconfig")
+    tag_index.remove_tag(tag_id)
     return {"ok": True}
@@ -0,0 +1,243 @@
+"""
+Import / export cấu hình camera hàng loạt (JSON / CSV) kèm tag.
+
+Import chạy trong một transaction: kiểm tra toàn bộ file trước, các dòng hợp lệ được
+ghi bằng vài câu lệnh theo tập (INSERT nhiều dòng, UPDATE theo khoá chính,
+thay tag link bằng một DELETE + một INSERT), không commit theo từng camera.
+"""
+import csv
+import io
+import json
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from model.db_model import CameraConfig, CameraConfigImportRow, CameraConfigTagLink, Tag
+
+CAMERA_FIELDS = [name for name in CameraConfigImportRow.model_fields if name not in ("id", "tags", "tag_ids")]
+CSV_COLUMNS = ["id"] + CAMERA_FIELDS + ["tags"]
+# Trong CSV, nhiều tag nằm chung một ô, ngăn bằng "|"
+CSV_TAG_SEPARATOR = "|"
+BULK_MEDIA_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class BulkImportError(ValueError):
+    """File import không đọc được (sai định dạng, thiếu cột...)."""
+
+
+def parse_import_file(content: bytes, file_format: str) -> List[dict]:
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise BulkImportError("File must be UTF-8 encoded")
+
+    if file_format == "json":
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BulkImportError(f"Invalid JSON: {e}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise BulkImportError("JSON import must be a list of camera objects")
+        return rows
+
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {"name", "webrtc_ip", "panorama"} - set(reader.fieldnames or [])
+    if missing:
+        raise BulkImportError(f"CSV is missing required columns: {', '.join(sorted(missing))}")
+    rows = []
+    for record in reader:
+        # Ô trống = không có giá trị; cột tags trống = camera không có tag
+        row = {key: value for key, value in record.items() if key and value not in (None, "")}
+        if "tags" in reader.fieldnames:
+            row["tags"] = [tag.strip() for tag in record.get("tags", "").split(CSV_TAG_SEPARATOR) if tag.strip()]
+        rows.append(row)
+    return rows
+
+
+async def export_cameras(session: AsyncSession) -> List[dict]:
+    """Toàn bộ camera (theo id) kèm danh sách tên tag."""
+    result = await session.execute(select(*(CameraConfig.__table__.columns)).order_by(CameraConfig.id))
+    cameras = [dict(row) for row in result.mappings()]
+    tags_by_camera: Dict[int, List[str]] = {camera["id"]: [] for camera in cameras}
+    links = await session.execute(
+        select(CameraConfigTagLink.camera_config_id, Tag.tag_name)
+        .join(Tag, Tag.id == CameraConfigTagLink.tag_id)
+        .order_by(Tag.id)
+    )
+    for camera_id, tag_name in links.all():
+        tags_by_camera.setdefault(camera_id, []).append(tag_name)
+    for camera in cameras:
+        camera["tags"] = tags_by_camera[camera["id"]]
+    return [{key: camera.get(key) for key in CSV_COLUMNS} for camera in cameras]
+
+
+def cameras_to_csv(cameras: List[dict]) -> str:
+    buffer = io.StringIO()
+    # BOM để Excel mở đúng tiếng Việt
+    buffer.write("\ufeff")
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for camera in cameras:
+        writer.writerow({**camera, "tags": CSV_TAG_SEPARATOR.join(camera["tags"])})
+    return buffer.getvalue()
+
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()]
+
+
+async def import_cameras(
+    session: AsyncSession,
+    rows: List[dict],
+    create_missing_tags: bool = False,
+    dry_run: bool = False,
+) -> Tuple[dict, Dict[int, Set[int]], bool]:
+    """
+    Upsert camera từ các dòng đã parse. Trả báo cáo từng dòng:
+    {"row", "status": created | updated | error, "id", "name", "errors"}.
+    Dòng lỗi bị bỏ qua, các dòng còn lại được ghi và commit một lần (dry_run thì rollback).
+    Dòng cập nhật chỉ ghi các trường có trong dòng; created_tags khi dry_run là các tag sẽ được tạo.
+    Trả (báo cáo, {camera_id: tag_ids mới}, có tạo tag mới hay không) để caller cập nhật
+    version bảng và tag index sau commit.
+    """
+    report: List[dict] = []
+    parsed: List[Tuple[int, CameraConfigImportRow]] = []
+    for index, raw in enumerate(rows, start=1):
+        try:
+            parsed.append((index, CameraConfigImportRow.model_validate(raw)))
+        except ValidationError as e:
+            report.append({"row": index, "status": "error", "id": raw.get("id"), "name": raw.get("name"), "errors": _validation_messages(e)})
+
+    # Tra cứu một lần: camera hiện có theo id / name, tag theo tên / id
+    existing = await session.execute(select(CameraConfig.id, CameraConfig.name))
+    existing_ids: Set[int] = set()
+    ids_by_name: Dict[str, List[int]] = {}
+    for camera_id, name in existing.all():
+        existing_ids.add(camera_id)
+        ids_by_name.setdefault(name, []).append(camera_id)
+    tag_rows = await session.execute(select(Tag.id, Tag.tag_name))
+    tag_id_by_name: Dict[str, int] = {}
+    for tag_id, tag_name in tag_rows.all():
+        tag_id_by_name.setdefault(tag_name, tag_id)
+    known_tag_ids = set(tag_id_by_name.values())
+
+    inserts: List[Tuple[int, dict, Optional[Set[int]]]] = []
+    updates: List[Tuple[int, dict, Optional[Set[int]]]] = []
+    # Tên tag chưa có trong DB (create_missing_tags) của từng dòng hợp lệ, chỉ tạo sau khi kiểm tra xong
+    pending_tags: Dict[int, Set[str]] = {}
+    seen_ids: Set[int] = set()
+    seen_new_names: Set[str] = set()
+    for index, row in parsed:
+        errors = []
+        camera_id = row.id
+        if camera_id is not None:
+            if camera_id not in existing_ids:
+                errors.append(f"id: camera {camera_id} not found")
+        else:
+            matches = ids_by_name.get(row.name, [])
+            if len(matches) > 1:
+                errors.append(f"name: {len(matches)} cameras named '{row.name}', include id to choose one")
+            elif matches:
+                camera_id = matches[0]
+            elif row.name in seen_new_names:
+                errors.append(f"name: duplicate new camera '{row.name}' in file")
+        if camera_id is not None and camera_id in seen_ids:
+            errors.append(f"id: camera {camera_id} appears more than once in file")
+
+        tag_ids: Optional[Set[int]] = None
+        missing_tags: Set[str] = set()
+        if row.tags is not None or row.tag_ids is not None:
+            tag_ids = set()
+            for name in row.tags or []:
+                if name in tag_id_by_name:
+                    tag_ids.add(tag_id_by_name[name])
+                elif create_missing_tags:
+                    missing_tags.add(name)
+                else:
+                    errors.append(f"tags: unknown tag '{name}'")
+            for tag_id in row.tag_ids or []:
+                if tag_id in known_tag_ids:
+                    tag_ids.add(tag_id)
+                else:
+                    errors.append(f"tag_ids: unknown tag id {tag_id}")
+
+        if errors:
+            report.append({"row": index, "status": "error", "id": camera_id, "name": row.name, "errors": errors})
+            continue
+        if missing_tags:
+            pending_tags[index] = missing_tags
+        if camera_id is None:
+            seen_new_names.add(row.name)
+            inserts.append((index, row.model_dump(include=set(CAMERA_FIELDS)), tag_ids))
+        else:
+            seen_ids.add(camera_id)
+            # Cập nhật chỉ các trường có trong file: dòng thiếu cột không xoá giá trị đang có
+            values = row.model_dump(include=set(CAMERA_FIELDS), exclude_unset=True)
+            updates.append((index, {"id": camera_id, **values}, tag_ids))
+
+    # Tag mới chỉ tạo cho các dòng hợp lệ, và không tạo khi dry_run
+    new_tag_names = sorted(set().union(*pending_tags.values())) if pending_tags else []
+    if new_tag_names and not dry_run:
+        created = await session.execute(
+            insert(Tag).returning(Tag.id, Tag.tag_name, sort_by_parameter_order=True),
+            [{"tag_name": name} for name in new_tag_names],
+        )
+        for tag_id, tag_name in created.all():
+            tag_id_by_name[tag_name] = tag_id
+        for index, _, tag_ids in inserts + updates:
+            for name in pending_tags.get(index, ()):
+                tag_ids.add(tag_id_by_name[name])
+
+    # UPDATE executemany theo từng nhóm dòng có cùng tập cột
+    update_batches: Dict[Tuple[str, ...], List[dict]] = {}
+    for _, values, _ in updates:
+        update_batches.setdefault(tuple(sorted(values)), []).append(values)
+    for batch in update_batches.values():
+        await session.execute(update(CameraConfig), batch)
+    for index, values, _ in updates:
+        report.append({"row": index, "status": "updated", "id": values["id"], "name": values["name"], "errors": []})
+    inserted_ids: List[int] = []
+    if inserts:
+        result = await session.execute(
+            insert(CameraConfig).returning(CameraConfig.id, sort_by_parameter_order=True),
+            [values for _, values, _ in inserts],
+        )
+        inserted_ids = list(result.scalars().all())
+        for (index, values, _), camera_id in zip(inserts, inserted_ids):
+            report.append({"row": index, "status": "created", "id": camera_id, "name": values["name"], "errors": []})
+
+    # Thay tag link theo tập: xoá link cũ của các camera có khai báo tag, chèn link mới một lần
+    camera_tags: Dict[int, Set[int]] = {values["id"]: tag_ids for _, values, tag_ids in updates if tag_ids is not None}
+    camera_tags.update({
+        camera_id: tag_ids for (_, _, tag_ids), camera_id in zip(inserts, inserted_ids) if tag_ids is not None
+    })
+    if camera_tags:
+        await session.execute(
+            delete(CameraConfigTagLink).where(CameraConfigTagLink.camera_config_id.in_(list(camera_tags)))
+        )
+        links = [
+            {"camera_config_id": camera_id, "tag_id": tag_id}
+            for camera_id, tag_ids in camera_tags.items() for tag_id in sorted(tag_ids)
+        ]
+        if links:
+            await session.execute(insert(CameraConfigTagLink), links)
+
+    if dry_run:
+        await session.rollback()
+    else:
+        await session.commit()
+
+    report.sort(key=lambda item: item["row"])
+    summary = {status: sum(item["status"] == status for item in report) for status in ("created", "updated", "error")}
+    return {
+        "dry_run": dry_run,
+        "summary": summary,
+        "created_tags": new_tag_names,
+        "rows": report,
+    }, camera_tags, bool(new_tag_names and not dry_run)
@@ -0,0 +1,220 @@
+"""
+Middleware nén response dạng ASGI thuần (không qua BaseHTTPMiddleware), nên response
+stream (export CSV/Parquet...) được nén dần theo từng chunk thay vì gom cả body.
+
+- Chọn encoding theo Accept-Encoding (q-value), ưu tiên br > zstd > gzip; br/zstd chỉ bật khi đã cài brotli / zstandard.
+- Chỉ nén content-type dạng text (JSON, CSV, XML...), bỏ qua ảnh / video / file đã nén (kể cả trong /static).
+- Response nhỏ hơn minimum_size gửi nguyên.
+- Mức nén giảm khi CPU bận (đo bằng psutil).
+"""
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+import psutil
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# brotli / zstandard không bắt buộc: thiếu thì chỉ dùng gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_MINIMUM_SIZE = 1024
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/msgpack",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+ENCODING_PREFERENCE = ("br", "zstd", "gzip")
+
+# Mức nén theo tải CPU: (ngưỡng CPU %, {encoding: level}) - dùng mức đầu tiên có CPU < ngưỡng
+LEVELS_BY_CPU = (
+    (50.0, {"br": 5, "zstd": 6, "gzip": 6}),
+    (80.0, {"br": 3, "zstd": 3, "gzip": 4}),
+    (101.0, {"br": 1, "zstd": 1, "gzip": 1}),
+)
+CPU_SAMPLE_INTERVAL = 1.0
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return tuple(
+        encoding for encoding in ENCODING_PREFERENCE
+        if encoding == "gzip" or (encoding == "br" and brotli) or (encoding == "zstd" and zstandard)
+    )
+
+
+def choose_encoding(accept_encoding: str, encodings: Tuple[str, ...]) -> Optional[str]:
+    """Encoding có q cao nhất trong Accept-Encoding (hoà thì theo ENCODING_PREFERENCE)."""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -index, encoding)
+        for index, encoding in enumerate(encodings)
+    ]
+    best = max(candidates, default=None)
+    if best is None or best[0] <= 0:
+        return None
+    return best[2]
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+        or media_type.endswith("+xml")
+    )
+
+
+class _CpuLevel:
+    """Mức nén hiện tại theo CPU, lấy mẫu psutil tối đa mỗi CPU_SAMPLE_INTERVAL giây."""
+
+    def __init__(self):
+        self._sampled_at = 0.0
+        self._levels = LEVELS_BY_CPU[0][1]
+        psutil.cpu_percent(interval=None)  # lần gọi đầu luôn trả 0, mồi trước
+
+    def level(self, encoding: str) -> int:
+        now = time.monotonic()
+        if now - self._sampled_at >= CPU_SAMPLE_INTERVAL:
+            self._sampled_at = now
+            cpu = psutil.cpu_percent(interval=None)
+            self._levels = next(levels for limit, levels in LEVELS_BY_CPU if cpu < limit)
+        return self._levels[encoding]
+
+
+class _Compressor:
+    """Giao diện chung: compress() từng chunk, flush() đẩy dữ liệu đã nén ra (stream), finish() kết thúc."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        if self.encoding == "zstd":
+            return self._zstd.compress(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.flush()
+        if self.encoding == "zstd":
+            return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        if self.encoding == "zstd":
+            return self._zstd.flush()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings()
+        self.cpu_level = _CpuLevel()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""), self.encodings)
+        if encoding is None or "range" in request_headers:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encoding, self.cpu_level.level(encoding), self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, level: int, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        self.pending = b""
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            compressible = is_compressible(content_type) if content_type else False
+            if compressible:
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            if (
+                not compressible
+                or "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or message["status"] < 200
+            ):
+                self.passthrough = True
+                await self._send(message)
+                return
+            # Giữ lại start cho tới khi biết body đủ lớn để nén
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            # Gom các chunk đầu cho tới khi đủ minimum_size (response qua BaseHTTPMiddleware
+            # luôn bị chia chunk kèm more_body=True, kể cả body nhỏ)
+            self.pending += body
+            if len(self.pending) < self.minimum_size:
+                if more_body:
+                    return
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": self.pending, "more_body": False})
+                return
+            body, self.pending = self.pending, b""
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            del headers["content-length"]
+            headers["content-encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # Body đã nén khác bytes gốc: ETag mạnh chuyển thành ETag yếu
+                headers["etag"] = f"W/{etag}"
+            self.compressor = _Compressor(self.encoding, self.level)
+            await self._send(self.start_message)
+
+        data = self.compressor.compress(body)
+        data += self.compressor.flush() if more_body else self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,111 @@
+"""
+Đếm facet (status, location, camera, error_detail) cho bộ filter hiện tại của bảng worker event,
+bằng một câu GROUP BY GROUPING SETS: panel filter chỉ tốn một query thay vì một query cho mỗi chiều.
+
+Khi filter chỉ dùng các chiều có trong rollup theo giờ (status, location, error_code, start_time tròn giờ)
+thì đọc bảng eventrollup thay cho workerevent.
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import String, cast, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from func.event_filters import filter_worker_events
+from model.db_model import CameraConfig, EventRollup, WorkerEvent
+
+FACET_NAMES = ("status", "location", "camera", "error_detail")
+DEFAULT_FACET_LIMIT = 50
+
+
+def rollup_applicable(
+    query: Optional[str] = None,
+    event_id: Optional[str] = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    **filters,
+) -> bool:
+    """
+    Rollup cho kết quả đúng bằng bảng gốc khi mọi filter là điều kiện trên chiều của rollup:
+    không tìm theo camera_name / event id, start_time tròn giờ, không có end_time
+    (timestamp <= end_time cắt ngang giờ cuối).
+    """
+    return not query and not event_id and end_time is None and (not start_time or start_time % 3600 == 0)
+
+
+def _facet_statement(status_column, location_column, camera_column, error_column, count_column, camera_join):
+    grouping = [
+        func.grouping(column).label(f"g_{name}")
+        for name, column in zip(FACET_NAMES, (status_column, location_column, camera_column, error_column))
+    ]
+    return (
+        select(
+            status_column.label("status"),
+            location_column.label("location"),
+            camera_column.label("camera_id"),
+            CameraConfig.name.label("camera_name"),
+            error_column.label("error_detail"),
+            *grouping,
+            count_column.label("count"),
+        )
+        .select_from(camera_join)
+        .group_by(func.grouping_sets(
+            tuple_(status_column),
+            tuple_(location_column),
+            tuple_(camera_column, CameraConfig.name),
+            tuple_(error_column),
+        ))
+    )
+
+
+def _events_statement(filters: dict):
+    stmt = _facet_statement(
+        WorkerEvent.status, WorkerEvent.location, WorkerEvent.camera_id, WorkerEvent.error_detail,
+        func.count(),
+        WorkerEvent.__table__.outerjoin(CameraConfig, CameraConfig.id == WorkerEvent.camera_id),
+    )
+    return filter_worker_events(stmt, **filters)
+
+
+def _rollup_statement(filters: dict):
+    total = func.sum(EventRollup.event_count)
+    stmt = _facet_statement(
+        EventRollup.status, EventRollup.location, EventRollup.camera_id, EventRollup.error_detail,
+        total,
+        EventRollup.__table__.outerjoin(CameraConfig, cast(CameraConfig.id, String) == EventRollup.camera_id),
+    ).where(EventRollup.source == "worker_event").having(total != 0)
+    return filter_worker_events(stmt, model=EventRollup, timestamp_column=EventRollup.hour, **filters)
+
+
+async def worker_event_facets(session: AsyncSession, limit: int = DEFAULT_FACET_LIMIT, **filters) -> dict:
+    """
+    {"total", "source": rollup | events, "facets": {status|location|camera|error_detail: [{"value", "count"}, ...]}}
+    Mỗi facet sắp theo count giảm dần, tối đa limit giá trị; facet camera kèm tên camera hiện tại.
+    filters: giống filter_worker_events (query, status, event_id, error_code, location, start_time, end_time).
+    """
+    use_rollup = rollup_applicable(**filters)
+    stmt = _rollup_statement(filters) if use_rollup else _events_statement(filters)
+    result = await session.execute(stmt)
+
+    facets: Dict[str, List[dict]] = {name: [] for name in FACET_NAMES}
+    for row in result.all():
+        count = int(row.count)
+        if row.g_status == 0:
+            facets["status"].append({"value": row.status, "count": count})
+        elif row.g_location == 0:
+            facets["location"].append({"value": row.location, "count": count})
+        elif row.g_camera == 0:
+            camera_id = row.camera_id
+            if use_rollup:
+                # camera_id trong rollup là chuỗi, "" = event không gắn camera
+                camera_id = int(camera_id) if camera_id else None
+            facets["camera"].append({"value": camera_id, "name": row.camera_name, "count": count})
+        elif row.g_error_detail == 0:
+            facets["error_detail"].append({"value": row.error_detail, "count": count})
+
+    # status không NULL nên tổng theo status = tổng số dòng khớp filter
+    total = sum(item["count"] for item in facets["status"])
+    for name, items in facets.items():
+        items.sort(key=lambda item: (-item["count"], str(item["value"])))
+        facets[name] = items[:limit]
+    return {"total": total, "source": "rollup" if use_rollup else "events", "facets": facets}
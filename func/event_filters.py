@@ -0,0 +1,85 @@
+import datetime
+from typing import Optional
+
+from sqlalchemy import String, cast, false
+
+from model.db_model import Alarm, WorkerEvent
+
+
+def epoch_to_datetime(seconds: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def filter_worker_events(
+    stmt,
+    *,
+    model=WorkerEvent,
+    timestamp_column=None,
+    query: Optional[str] = None,
+    status: Optional[int] = None,
+    event_id: Optional[str] = None,
+    error_code: Optional[str] = None,
+    location: Optional[str] = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+):
+    """
+    Bộ filter của /worker-events, dùng chung cho danh sách, export và thống kê.
+    start_time/end_time là epoch giây, so sánh trực tiếp với cột timestamptz.
+    model / timestamp_column: lọc bảng khác có cùng cột status, error_detail, location
+    (EventRollup với cột hour); query / event_id chỉ dùng được với WorkerEvent.
+    """
+    if timestamp_column is None:
+        timestamp_column = model.timestamp
+    if query:
+        # camera_id là FK số nguyên: query dạng số khớp chính xác id (btree), còn lại tìm theo tên camera
+        query = query.strip()
+        condition = WorkerEvent.camera_name.ilike(f"%{query}%")
+        if query.isdigit() and len(query) <= 9:
+            condition = (WorkerEvent.camera_id == int(query)) | condition
+        stmt = stmt.where(condition)
+    if status is not None:
+        stmt = stmt.where(model.status == status)
+    if event_id:
+        # Exact/prefix match trên id::varchar (có expression index varchar_pattern_ops),
+        # thay cho ILIKE '%...%' phải quét cả bảng
+        event_id = event_id.strip()
+        if event_id.isdigit():
+            stmt = stmt.where(cast(WorkerEvent.id, String).like(f"{event_id}%"))
+        else:
+            stmt = stmt.where(false())
+    if error_code:
+        stmt = stmt.where(model.error_detail.ilike(f"%{error_code}%"))
+    if location:
+        stmt = stmt.where(model.location.ilike(f"%{location}%"))
+    if start_time:
+        stmt = stmt.where(timestamp_column >= epoch_to_datetime(start_time))
+    if end_time:
+        stmt = stmt.where(timestamp_column <= epoch_to_datetime(end_time))
+    return stmt
+
+
+def filter_alarms(
+    stmt,
+    *,
+    camera_id: Optional[int] = None,
+    is_confirmed: Optional[bool] = None,
+    error_code: Optional[str] = None,
+    location: Optional[str] = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+):
+    """Bộ filter cho alarm (camera_id khớp chính xác như /alarms, còn lại giống /worker-events)."""
+    if camera_id is not None:
+        stmt = stmt.where(Alarm.camera_id == camera_id)
+    if is_confirmed is not None:
+        stmt = stmt.where(Alarm.is_confirmed == is_confirmed)
+    if error_code:
+        stmt = stmt.where(Alarm.error_detail.ilike(f"%{error_code}%"))
+    if location:
+        stmt = stmt.where(Alarm.location.ilike(f"%{location}%"))
+    if start_time:
+        stmt = stmt.where(Alarm.timestamp >= epoch_to_datetime(start_time))
+    if end_time:
+        stmt = stmt.where(Alarm.timestamp <= epoch_to_datetime(end_time))
+    return stmt
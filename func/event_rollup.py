@@ -0,0 +1,179 @@
+import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import delete
+
+from func.table_version import table_versions
+from model.db_model import EventRollup, async_session_maker
+
+ROLLUP_SOURCES = ("alarm", "worker_event")
+
+
+def hour_bucket(timestamp: datetime.datetime) -> datetime.datetime:
+    """Đầu giờ theo UTC (khớp date_trunc('hour', ts AT TIME ZONE 'UTC') khi rebuild)."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone()
+    return timestamp.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def camera_key(camera_id: Optional[int]) -> str:
+    """camera_id trong rollup là chuỗi ("" khi event không còn gắn camera), khớp camera_id::text khi rebuild."""
+    return "" if camera_id is None else str(camera_id)
+
+
+def event_status(source: str, event) -> int:
+    if source == "alarm":
+        return 1 if event.is_confirmed else 0
+    return event.status
+
+
+async def record_event(session: AsyncSession, source: str, event, delta: int = 1, status: Optional[int] = None):
+    """
+    Cộng delta vào ô rollup của event (Alarm hoặc WorkerEvent).
+    Chạy trong session của request, commit cùng với thay đổi trên event.
+    """
+    stmt = insert(EventRollup).values(
+        source=source,
+        hour=hour_bucket(event.timestamp),
+        camera_id=camera_key(event.camera_id),
+        location=event.location or "",
+        error_detail=event.error_detail or "",
+        status=event_status(source, event) if status is None else status,
+        event_count=delta,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            EventRollup.source, EventRollup.hour, EventRollup.camera_id,
+            EventRollup.location, EventRollup.error_detail, EventRollup.status,
+        ],
+        set_={"event_count": EventRollup.event_count + stmt.excluded.event_count},
+    )
+    await session.execute(stmt)
+
+
+async def record_status_change(session: AsyncSession, source: str, event, old_status: int):
+    """Chuyển một event từ ô trạng thái cũ sang ô trạng thái hiện tại của nó."""
+    new_status = event_status(source, event)
+    if new_status == old_status:
+        return
+    await record_event(session, source, event, delta=-1, status=old_status)
+    await record_event(session, source, event, delta=1, status=new_status)
+
+
+async def record_status_changes(session: AsyncSession, source: str, changes: Iterable[Tuple[object, int, int]]):
+    """
+    Bản theo lô của record_status_change cho các thao tác hàng loạt.
+    changes: (event, old_status, new_status), event là ORM object hoặc row có timestamp/camera_id/location/error_detail.
+    Delta được cộng dồn theo ô trước rồi ghi bằng một câu INSERT ... ON CONFLICT nhiều dòng.
+    """
+    deltas: Dict[tuple, int] = {}
+    for event, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        cell = (hour_bucket(event.timestamp), camera_key(event.camera_id), event.location or "", event.error_detail or "")
+        deltas[cell + (old_status,)] = deltas.get(cell + (old_status,), 0) - 1
+        deltas[cell + (new_status,)] = deltas.get(cell + (new_status,), 0) + 1
+    rows = [
+        {
+            "source": source, "hour": hour, "camera_id": camera_id, "location": location,
+            "error_detail": error_detail, "status": status, "event_count": delta,
+        }
+        for (hour, camera_id, location, error_detail, status), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    stmt = insert(EventRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            EventRollup.source, EventRollup.hour, EventRollup.camera_id,
+            EventRollup.location, EventRollup.error_detail, EventRollup.status,
+        ],
+        set_={"event_count": EventRollup.event_count + stmt.excluded.event_count},
+    )
+    await session.execute(stmt)
+
+
+async def detach_camera(session: AsyncSession, camera_id: int):
+    """
+    Khi xoá camera, FK ON DELETE SET NULL làm event của camera đó mất camera_id:
+    gộp các ô rollup của camera vào ô camera_id = "" tương ứng. Chạy trong transaction xoá camera.
+    """
+    await session.execute(text("""
+        INSERT INTO eventrollup (source, hour, camera_id, location, error_detail, status, event_count)
+        SELECT source, hour, '', location, error_detail, status, sum(event_count)
+        FROM eventrollup WHERE camera_id = :camera_id
+        GROUP BY source, hour, location, error_detail, status
+        ON CONFLICT (source, hour, camera_id, location, error_detail, status)
+        DO UPDATE SET event_count = eventrollup.event_count + EXCLUDED.event_count
+    """), {"camera_id": camera_key(camera_id)})
+    await session.execute(delete(EventRollup).where(EventRollup.camera_id == camera_key(camera_id)))
+
+
+# Tính lại rollup của một khoảng thời gian từ bảng gốc bằng một câu INSERT ... SELECT ... GROUP BY
+_REBUILD_STATEMENTS = {
+    "alarm": """
+        INSERT INTO eventrollup (source, hour, camera_id, location, error_detail, status, event_count)
+        SELECT 'alarm', date_trunc('hour', "timestamp" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+               coalesce(camera_id::text, ''), coalesce(location, ''), coalesce(error_detail, ''),
+               CASE WHEN is_confirmed THEN 1 ELSE 0 END, count(*)
+        FROM alarm
+        WHERE "timestamp" >= :start AND "timestamp" < :stop
+        GROUP BY 2, 3, 4, 5, 6
+    """,
+    "worker_event": """
+        INSERT INTO eventrollup (source, hour, camera_id, location, error_detail, status, event_count)
+        SELECT 'worker_event', date_trunc('hour', "timestamp" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+               coalesce(camera_id::text, ''), coalesce(location, ''), coalesce(error_detail, ''),
+               status, count(*)
+        FROM workerevent
+        WHERE "timestamp" >= :start AND "timestamp" < :stop
+        GROUP BY 2, 3, 4, 5, 6
+    """,
+}
+ROLLUP_TABLES = {"alarm": "alarm", "worker_event": "workerevent"}
+REBUILD_RANGE = datetime.timedelta(days=1)
+
+
+async def rebuild_rollups(session: Optional[AsyncSession] = None) -> Dict[str, int]:
+    """
+    Tính lại bảng EventRollup từ alarm / workerevent theo từng khoảng REBUILD_RANGE (tròn giờ),
+    mỗi khoảng một transaction ngắn: khoá bảng gốc (SHARE, chặn ghi) chỉ trong lúc xoá + tính lại
+    các ô của khoảng đó, nên ingest / đổi trạng thái chỉ phải chờ vài ms thay vì cả lần rebuild.
+    Trả số ô rollup đã ghi cho mỗi nguồn.
+    """
+    if session is None:
+        async with async_session_maker() as own_session:
+            return await rebuild_rollups(own_session)
+    rows = {}
+    for source in ROLLUP_SOURCES:
+        table = ROLLUP_TABLES[source]
+        rows[source] = 0
+        # Ô nằm ngoài khoảng thời gian của bảng gốc (event đã bị xoá) thì bỏ luôn
+        await session.execute(text(f"LOCK TABLE {table} IN SHARE MODE"))
+        first, last = (await session.execute(text(f'SELECT min("timestamp"), max("timestamp") FROM {table}'))).one()
+        outside = delete(EventRollup).where(EventRollup.source == source)
+        if first is not None:
+            start, end = hour_bucket(first), hour_bucket(last)
+            outside = outside.where((EventRollup.hour < start) | (EventRollup.hour > end))
+        await session.execute(outside)
+        await session.commit()
+        # Cache đọc rollup (facet worker event) hết hiệu lực sau mỗi khoảng đã ghi lại
+        table_versions.bump("eventrollup")
+        if first is None:
+            continue
+
+        while start <= end:
+            stop = start + REBUILD_RANGE
+            await session.execute(text(f"LOCK TABLE {table} IN SHARE MODE"))
+            await session.execute(delete(EventRollup).where(
+                EventRollup.source == source, EventRollup.hour >= start, EventRollup.hour < stop,
+            ))
+            result = await session.execute(text(_REBUILD_STATEMENTS[source]), {"start": start, "stop": stop})
+            rows[source] += result.rowcount
+            await session.commit()
+            table_versions.bump("eventrollup")
+            start = stop
+    return rows
@@ -0,0 +1,108 @@
+import csv
+import datetime
+import io
+from typing import AsyncIterator, List, Sequence
+
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer
+
+from model.db_model import async_session_maker
+
+# pyarrow không bắt buộc: thiếu thì chỉ export được CSV
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_BATCH_SIZE = 5000
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+async def stream_rows(stmt, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[Sequence]:
+    """
+    Đọc kết quả stmt qua server-side cursor, mỗi lần một lô batch_size dòng.
+    Dùng session riêng vì generator còn chạy sau khi request handler (và session của nó) đã kết thúc.
+    """
+    async with async_session_maker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.partitions(batch_size):
+            yield partition
+
+
+async def csv_chunks(stmt, columns: List) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM để Excel mở đúng tiếng Việt
+    buffer.write("\ufeff")
+    writer.writerow([column.name for column in columns])
+    async for rows in stream_rows(stmt):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_type(column):
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC") if column.type.timezone else pa.timestamp("us")
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, (Integer, BigInteger)):
+        return pa.int64()
+    return pa.string()
+
+
+class _ChunkSink(io.RawIOBase):
+    """File-like chỉ ghi: ParquetWriter ghi vào, generator lấy dần các byte ra để stream."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def parquet_chunks(stmt, columns: List) -> AsyncIterator[bytes]:
+    """Mỗi lô dòng thành một row group; footer được ghi khi đóng writer."""
+    schema = pa.schema([(column.name, _arrow_type(column)) for column in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in stream_rows(stmt):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_filename(prefix: str, file_format: str) -> str:
+    return f"{prefix}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.{file_format}"
@@ -0,0 +1,83 @@
+"""
+Lớp serialize JSON dùng chung cho HTTP response và WebSocket.
+
+Backend chọn bằng key json_backend trong config.yaml: "orjson" (mặc định nếu đã cài) hoặc "stdlib".
+orjson serialize trực tiếp datetime / dict / list nên không cần đi qua jsonable_encoder.
+Với response là pydantic/SQLModel, encode_model dùng TypeAdapter dựng sẵn theo kiểu (serializer của pydantic-core).
+"""
+import datetime
+import json
+from functools import lru_cache
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from starlette.websockets import WebSocket
+
+# orjson không bắt buộc: thiếu thì dùng json của stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = ("orjson", "stdlib")
+_backend = "orjson" if orjson is not None else "stdlib"
+
+
+def configure_json(backend: str = None):
+    """Chọn backend lúc khởi động app; backend không hợp lệ hoặc chưa cài thì về stdlib."""
+    global _backend
+    if backend not in JSON_BACKENDS:
+        backend = "orjson"
+    if backend == "orjson" and orjson is None:
+        print("orjson is not installed, falling back to stdlib json")
+        backend = "stdlib"
+    _backend = backend
+    print(f"JSON backend: {_backend}")
+
+
+def json_backend() -> str:
+    return _backend
+
+
+def _default(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    if _backend == "orjson":
+        # OPT_UTC_Z: giờ UTC in dạng "...Z" giống pydantic
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse dùng backend đã cấu hình; là default_response_class của app."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def model_adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def encode_model(response_type, value: Any) -> bytes:
+    """Serialize value (model, list[model], Optional[model]...) theo kiểu response_type, không validate lại."""
+    return model_adapter(response_type).dump_json(value)
+
+
+def model_response(response_type, value: Any, headers: dict = None) -> Response:
+    """Response JSON đã encode sẵn bằng model_adapter (bỏ qua bước validate + jsonable_encoder của FastAPI)."""
+    return Response(content=encode_model(response_type, value), media_type="application/json", headers=headers)
+
+
+async def send_json(websocket: WebSocket, content: Any):
+    """Thay cho websocket.send_json: cùng frame text nhưng encode bằng backend nhanh."""
+    await websocket.send_text(dumps(content).decode("utf-8"))
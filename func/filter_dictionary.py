@@ -0,0 +1,104 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import distinct
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from model.db_model import Alarm, ErrorDetail, WorkerEvent, async_session_maker
+
+# Các cột dùng cho dropdown filter của FE, theo từng loại event
+DICTIONARY_FIELDS = {
+    "worker_event": {
+        "location": WorkerEvent.location,
+        "camera_name": WorkerEvent.camera_name,
+        "error_code": WorkerEvent.error_detail,
+    },
+    "alarm": {
+        "location": Alarm.location,
+        "camera_name": Alarm.camera_name,
+        "error_code": Alarm.error_detail,
+    },
+    "error_detail": {
+        "location": ErrorDetail.location,
+        "error_code": ErrorDetail.error_name,
+    },
+}
+
+
+class FilterDictionary:
+    """
+    Từ điển giá trị distinct (location, camera_name, error_code) cho từng loại event, giữ trong RAM.
+    Cập nhật khi ingest, rebuild định kỳ từ DB cho chắc chắn.
+    Dropdown filter tốn O(kích thước từ điển) thay vì SELECT DISTINCT trên cả bảng event.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.version = 0
+        self._values: Dict[Tuple[str, str], Set[str]] = {}
+        self._sorted: Dict[Tuple[str, str], List[str]] = {}
+        # add() xảy ra trong lúc rebuild đang chờ DB, áp lại sau khi thay từ điển
+        self._rebuilding = 0
+        self._changes: List[Tuple[str, Dict[str, Optional[str]]]] = []
+
+    async def rebuild(self, session: Optional[AsyncSession] = None):
+        if session is None:
+            async with async_session_maker() as own_session:
+                return await self.rebuild(own_session)
+        values: Dict[Tuple[str, str], Set[str]] = {}
+        self._rebuilding += 1
+        start = len(self._changes)
+        try:
+            for source, fields in DICTIONARY_FIELDS.items():
+                for kind, column in fields.items():
+                    result = await session.execute(select(distinct(column)))
+                    values[(source, kind)] = {row[0] for row in result.all() if row[0]}
+        finally:
+            self._rebuilding -= 1
+        changes = self._changes[start:]
+        if not self._rebuilding:
+            self._changes = []
+
+        if values != self._values:
+            self.version += 1
+        self._values = values
+        self._sorted = {}
+        self.ready = True
+        for source, kinds in changes:
+            self.add(source, **kinds)
+
+    def add(self, source: str, **kinds: Optional[str]):
+        """Ghi nhận giá trị của một event mới, vd add("alarm", location=..., camera_name=..., error_code=...)."""
+        if self._rebuilding:
+            self._changes.append((source, kinds))
+        for kind, value in kinds.items():
+            if not value:
+                continue
+            key = (source, kind)
+            bucket = self._values.setdefault(key, set())
+            if value not in bucket:
+                bucket.add(value)
+                self._sorted.pop(key, None)
+                self.version += 1
+
+    def values(self, source: str, kind: str) -> List[str]:
+        key = (source, kind)
+        if key not in self._sorted:
+            self._sorted[key] = sorted(self._values.get(key, ()))
+        return self._sorted[key]
+
+
+filter_dictionary = FilterDictionary()
+
+
+async def filter_dictionary_rebuild_loop(interval_minutes: float):
+    """Task nền: rebuild từ điển định kỳ (bắt các thay đổi ngoài API, vd sửa tay trong DB)."""
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            await filter_dictionary.rebuild()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error rebuilding filter dictionary: {e}")
@@ -0,0 +1,158 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+SOURCE_CACHE_SIZE = 4   # Ảnh panorama đã decode giữ trong RAM (mỗi ảnh có thể vài chục MB)
+MAP_CACHE_BYTES = 64 * 1024 * 1024   # Tổng dung lượng bảng tra projection giữ trong RAM
+MAP_CACHE_MAX_PIXELS = 1920 * 1080   # View lớn hơn thì tính bảng tra mỗi lần, không cache
+VIEW_ANGLE_STEP = 0.5   # Độ - bước làm tròn góc nhìn
+
+_source_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+_source_lock = threading.Lock()
+_map_cache: "OrderedDict[Tuple, Tuple[np.ndarray, ...]]" = OrderedDict()
+_map_cache_bytes = 0
+_map_lock = threading.Lock()
+
+
+def quantize_view(yaw: float, pitch: float, fov: float) -> Tuple[float, float, float]:
+    """Làm tròn góc nhìn về VIEW_ANGLE_STEP độ để các view gần nhau dùng chung bảng tra."""
+    yaw = ((yaw + 180.0) % 360.0) - 180.0
+    pitch = max(-90.0, min(90.0, pitch))
+    fov = max(10.0, min(150.0, fov))
+    return tuple(round(value / VIEW_ANGLE_STEP) * VIEW_ANGLE_STEP for value in (yaw, pitch, fov))
+
+
+def projection_maps(
+    src_width: int,
+    src_height: int,
+    out_width: int,
+    out_height: int,
+    yaw: float,
+    pitch: float,
+    fov: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bảng tra (x0, y0, wx, wy) đã cache theo tham số. Cache LRU giới hạn theo tổng byte
+    (MAP_CACHE_BYTES); view lớn hơn MAP_CACHE_MAX_PIXELS không được cache.
+    """
+    global _map_cache_bytes
+    key = (src_width, src_height, out_width, out_height, yaw, pitch, fov)
+    with _map_lock:
+        cached = _map_cache.get(key)
+        if cached is not None:
+            _map_cache.move_to_end(key)
+            return cached
+    maps = _compute_projection_maps(*key)
+    if out_width * out_height > MAP_CACHE_MAX_PIXELS:
+        return maps
+    size = sum(array.nbytes for array in maps)
+    with _map_lock:
+        if key not in _map_cache:
+            _map_cache[key] = maps
+            _map_cache_bytes += size
+        while _map_cache_bytes > MAP_CACHE_BYTES and len(_map_cache) > 1:
+            _, evicted = _map_cache.popitem(last=False)
+            _map_cache_bytes -= sum(array.nbytes for array in evicted)
+    return maps
+
+
+def _compute_projection_maps(
+    src_width: int,
+    src_height: int,
+    out_width: int,
+    out_height: int,
+    yaw: float,
+    pitch: float,
+    fov: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bảng tra equirectangular -> perspective cho một (độ phân giải, góc nhìn).
+    Trả về (x0, y0, wx, wy) cho nội suy bilinear, lưu gọn để cache: chỉ số int16
+    (int32 nếu ảnh nguồn quá rộng), trọng số uint8 (0..255). x1 / y1 suy ra lúc render.
+    """
+    focal = (out_width / 2.0) / np.tan(np.radians(fov) / 2.0)
+    u = (np.arange(out_width, dtype=np.float32) - (out_width - 1) / 2.0) / focal
+    v = (np.arange(out_height, dtype=np.float32) - (out_height - 1) / 2.0) / focal
+    x, y = np.meshgrid(u, -v)
+    z = np.ones_like(x)
+    norm = np.sqrt(x * x + y * y + z * z)
+    x, y, z = x / norm, y / norm, z / norm
+
+    # Xoay theo pitch (trục x) rồi yaw (trục y)
+    pitch_rad, yaw_rad = np.radians(pitch), np.radians(yaw)
+    cos_p, sin_p = np.cos(pitch_rad), np.sin(pitch_rad)
+    y, z = y * cos_p + z * sin_p, -y * sin_p + z * cos_p
+    cos_y, sin_y = np.cos(yaw_rad), np.sin(yaw_rad)
+    x, z = x * cos_y + z * sin_y, -x * sin_y + z * cos_y
+
+    lon = np.arctan2(x, z)
+    lat = np.arcsin(np.clip(y, -1.0, 1.0))
+    src_x = (lon / (2 * np.pi) + 0.5) * src_width - 0.5
+    src_y = (0.5 - lat / np.pi) * src_height - 0.5
+
+    x0 = np.floor(src_x)
+    y0 = np.floor(src_y)
+    wx = np.rint((src_x - x0) * 255).astype(np.uint8)
+    wy = np.rint((src_y - y0) * 255).astype(np.uint8)
+    wy[y0 < 0] = 0
+    index_type = np.int16 if max(src_width, src_height) <= np.iinfo(np.int16).max else np.int32
+    # Kinh độ quay vòng, vĩ độ kẹp ở hai cực (y0 = -1 ở cực trên kẹp về 0)
+    x0 = (x0.astype(np.int32) % src_width).astype(index_type)
+    y0 = np.clip(y0.astype(np.int32), 0, src_height - 1).astype(index_type)
+    for array in (x0, y0, wx, wy):
+        array.setflags(write=False)
+    return x0, y0, wx, wy
+
+
+def load_panorama(path: str) -> np.ndarray:
+    """Decode ảnh panorama thành mảng RGB, cache vài ảnh gần nhất theo (path, size, mtime)."""
+    stat_result = os.stat(path)
+    key = (path, stat_result.st_size, stat_result.st_mtime_ns)
+    with _source_lock:
+        cached = _source_cache.get(key)
+        if cached is not None:
+            _source_cache.move_to_end(key)
+            return cached
+    with Image.open(path) as image:
+        array = np.asarray(image.convert("RGB"), dtype=np.uint8)
+    with _source_lock:
+        _source_cache[key] = array
+        while len(_source_cache) > SOURCE_CACHE_SIZE:
+            _source_cache.popitem(last=False)
+    return array
+
+
+def render_perspective(
+    path: str,
+    yaw: float,
+    pitch: float,
+    fov: float,
+    out_width: int,
+    out_height: int,
+    quality: int = 85,
+) -> bytes:
+    """
+    Render một view perspective từ ảnh equirectangular, trả về JPEG bytes.
+    Hàm blocking - gọi qua run_in_executor.
+    """
+    source = load_panorama(path)
+    src_height, src_width = source.shape[:2]
+    x0, y0, wx, wy = projection_maps(src_width, src_height, out_width, out_height, yaw, pitch, fov)
+    x1 = x0 + 1
+    x1[x1 == src_width] = 0
+    y1 = np.minimum(y0 + 1, src_height - 1)
+    wx = wx[..., None] * np.float32(1 / 255)
+    wy = wy[..., None] * np.float32(1 / 255)
+
+    top = source[y0, x0] * (1 - wx) + source[y0, x1] * wx
+    bottom = source[y1, x0] * (1 - wx) + source[y1, x1] * wx
+    view = (top * (1 - wy) + bottom * wy + 0.5).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(view).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from func.static_router.v1.evidence_static import STATIC_DIR, versioned_url
+
+SPRITE_DIR = os.path.join(STATIC_DIR, "sprites")
+SPRITE_MAX_FILES = 500          # Số sprite tối đa giữ trên đĩa, cũ nhất bị xoá trước
+THUMBNAIL_CACHE_SIZE = 2000     # Số thumbnail giữ trong RAM
+BACKGROUND_COLOR = (32, 32, 32)
+
+_thumbnail_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+_thumbnail_lock = threading.Lock()
+
+
+def _file_signature(path: Optional[str]) -> Optional[Tuple[str, int, int]]:
+    if not path:
+        return None
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+def sprite_version(items: Sequence[Tuple[int, Optional[str]]], tile_width: int, tile_height: int, columns: int) -> str:
+    """
+    Version của một trang sprite: đổi khi danh sách alarm, file ảnh hoặc kích thước ô thay đổi.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(f"{tile_width}x{tile_height}x{columns}".encode())
+    for alarm_id, img_path in items:
+        digest.update(f"|{alarm_id}:{_file_signature(img_path)}".encode())
+    return digest.hexdigest()
+
+
+def load_thumbnail(path: str, tile_width: int, tile_height: int) -> Optional[np.ndarray]:
+    """Đọc ảnh và thu nhỏ vừa ô (giữ tỉ lệ), có cache LRU theo (file, kích thước ô)."""
+    signature = _file_signature(path)
+    if signature is None:
+        return None
+    key = (signature, tile_width, tile_height)
+    with _thumbnail_lock:
+        cached = _thumbnail_cache.get(key)
+        if cached is not None:
+            _thumbnail_cache.move_to_end(key)
+            return cached
+    try:
+        with Image.open(path) as image:
+            image.draft("RGB", (tile_width, tile_height))  # JPEG: decode ở độ phân giải thấp
+            image = image.convert("RGB")
+            image.thumbnail((tile_width, tile_height), Image.Resampling.BILINEAR)
+            thumbnail = np.asarray(image, dtype=np.uint8)
+    except Exception as e:
+        print(f"Error loading thumbnail {path}: {e}")
+        return None
+    with _thumbnail_lock:
+        _thumbnail_cache[key] = thumbnail
+        while len(_thumbnail_cache) > THUMBNAIL_CACHE_SIZE:
+            _thumbnail_cache.popitem(last=False)
+    return thumbnail
+
+
+def compose_sprite(thumbnails: List[Optional[np.ndarray]], tile_width: int, tile_height: int, columns: int) -> np.ndarray:
+    """
+    Ghép các thumbnail thành một ảnh lưới.
+    Các ô được đặt vào một mảng (n, h, w, 3) rồi reshape/transpose một lần thành (rows*h, cols*w, 3).
+    """
+    count = max(len(thumbnails), 1)
+    columns = max(1, min(columns, count))
+    rows = -(-count // columns)
+    tiles = np.empty((rows * columns, tile_height, tile_width, 3), dtype=np.uint8)
+    tiles[:] = BACKGROUND_COLOR
+    for index, thumbnail in enumerate(thumbnails):
+        if thumbnail is None:
+            continue
+        h, w = thumbnail.shape[:2]
+        top = (tile_height - h) // 2
+        left = (tile_width - w) // 2
+        tiles[index, top:top + h, left:left + w] = thumbnail
+    return (
+        tiles.reshape(rows, columns, tile_height, tile_width, 3)
+        .transpose(0, 2, 1, 3, 4)
+        .reshape(rows * tile_height, columns * tile_width, 3)
+    )
+
+
+def _prune_sprite_dir():
+    try:
+        entries = [entry for entry in os.scandir(SPRITE_DIR) if entry.is_file()]
+    except FileNotFoundError:
+        return
+    if len(entries) <= SPRITE_MAX_FILES:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - SPRITE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def build_sprite_sheet(
+    items: Sequence[Tuple[int, Optional[str]]],
+    tile_width: int = 160,
+    tile_height: int = 120,
+    columns: int = 10,
+) -> Dict:
+    """
+    Tạo (hoặc lấy lại từ đĩa) sprite cho danh sách (alarm_id, img_path).
+    Trả về URL sprite và bảng toạ độ từng alarm trong sprite.
+    Hàm blocking - gọi qua run_in_executor.
+    """
+    version = sprite_version(items, tile_width, tile_height, columns)
+    sprite_path = os.path.join(SPRITE_DIR, f"{version}.jpg")
+    map_path = os.path.join(SPRITE_DIR, f"{version}.json")
+
+    if os.path.exists(sprite_path) and os.path.exists(map_path):
+        with open(map_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    thumbnails = [load_thumbnail(img_path, tile_width, tile_height) if img_path else None for _, img_path in items]
+    sprite = compose_sprite(thumbnails, tile_width, tile_height, columns)
+    columns = sprite.shape[1] // tile_width
+
+    tiles = []
+    for index, ((alarm_id, _), thumbnail) in enumerate(zip(items, thumbnails)):
+        if thumbnail is None:
+            tiles.append({"alarm_id": alarm_id, "x": None, "y": None, "width": 0, "height": 0})
+            continue
+        h, w = thumbnail.shape[:2]
+        row, col = divmod(index, columns)
+        tiles.append({
+            "alarm_id": alarm_id,
+            "x": col * tile_width + (tile_width - w) // 2,
+            "y": row * tile_height + (tile_height - h) // 2,
+            "width": w,
+            "height": h,
+        })
+
+    os.makedirs(SPRITE_DIR, exist_ok=True)
+    tmp_path = f"{sprite_path}.tmp"
+    Image.fromarray(sprite).save(tmp_path, format="JPEG", quality=80)
+    os.replace(tmp_path, sprite_path)
+
+    sprite_map = {
+        "version": version,
+        "sprite_url": versioned_url(sprite_path.replace(os.sep, "/")),
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "columns": columns,
+        "rows": sprite.shape[0] // tile_height,
+        "tiles": tiles,
+    }
+    with open(map_path, "w", encoding="utf-8") as f:
+        json.dump(sprite_map, f)
+    _prune_sprite_dir()
+    return sprite_map
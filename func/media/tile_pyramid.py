@@ -0,0 +1,103 @@
+import math
+import os
+import shutil
+import threading
+from typing import Optional, Tuple
+
+from PIL import Image
+
+TILE_SIZE = 256
+TILE_OVERLAP = 1
+TILE_FORMAT = "jpg"
+TILE_QUALITY = 85
+
+DZI_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{tile_size}" '
+    'Overlap="{overlap}" Format="{format}">\n'
+    '  <Size Width="{width}" Height="{height}"/>\n'
+    '</Image>\n'
+)
+
+# Các ảnh đang được tạo pyramid (tránh chạy trùng khi nhiều request cùng lúc)
+_in_progress = set()
+_in_progress_lock = threading.Lock()
+
+
+def pyramid_paths(img_path: str) -> Tuple[str, str]:
+    """Trả về (đường dẫn .dzi, thư mục tiles) đặt cạnh ảnh gốc: <tên>.dzi và <tên>_files/."""
+    base = os.path.splitext(img_path)[0]
+    return f"{base}.dzi", f"{base}_files"
+
+
+def is_pyramid_ready(img_path: str) -> bool:
+    # File .dzi được ghi sau cùng nên có .dzi nghĩa là đã đủ tiles
+    return os.path.exists(pyramid_paths(img_path)[0])
+
+
+def is_pyramid_pending(img_path: str) -> bool:
+    with _in_progress_lock:
+        return img_path in _in_progress
+
+
+def _write_level(image: Image.Image, level_dir: str, tile_size: int, overlap: int, fmt: str, quality: int):
+    os.makedirs(level_dir, exist_ok=True)
+    width, height = image.size
+    for col in range(math.ceil(width / tile_size)):
+        left = max(col * tile_size - overlap, 0)
+        right = min((col + 1) * tile_size + overlap, width)
+        for row in range(math.ceil(height / tile_size)):
+            top = max(row * tile_size - overlap, 0)
+            bottom = min((row + 1) * tile_size + overlap, height)
+            tile = image.crop((left, top, right, bottom))
+            tile.save(os.path.join(level_dir, f"{col}_{row}.{fmt}"), quality=quality)
+
+
+def generate_pyramid(
+    img_path: str,
+    tile_size: int = TILE_SIZE,
+    overlap: int = TILE_OVERLAP,
+    fmt: str = TILE_FORMAT,
+    quality: int = TILE_QUALITY,
+) -> Optional[str]:
+    """
+    Tạo tile pyramid kiểu Deep Zoom (DZI) cho một ảnh, trả về đường dẫn file .dzi.
+    Tiles được ghi vào thư mục tạm rồi đổi tên một lần, .dzi ghi cuối cùng,
+    nên viewer không bao giờ thấy pyramid dở dang. Hàm blocking - chạy ở background.
+    """
+    dzi_path, files_dir = pyramid_paths(img_path)
+    if os.path.exists(dzi_path):
+        return dzi_path
+    with _in_progress_lock:
+        if img_path in _in_progress:
+            return None
+        _in_progress.add(img_path)
+
+    tmp_dir = f"{files_dir}.tmp"
+    try:
+        with Image.open(img_path) as source:
+            image = source.convert("RGB")
+        width, height = image.size
+        max_level = math.ceil(math.log2(max(width, height, 1)))
+
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        level_image = image
+        for level in range(max_level, -1, -1):
+            _write_level(level_image, os.path.join(tmp_dir, str(level)), tile_size, overlap, fmt, quality)
+            if level > 0:
+                level_size = (max(1, math.ceil(level_image.width / 2)), max(1, math.ceil(level_image.height / 2)))
+                level_image = level_image.resize(level_size, Image.Resampling.BILINEAR)
+
+        shutil.rmtree(files_dir, ignore_errors=True)
+        os.replace(tmp_dir, files_dir)
+        with open(f"{dzi_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(DZI_TEMPLATE.format(tile_size=tile_size, overlap=overlap, format=fmt, width=width, height=height))
+        os.replace(f"{dzi_path}.tmp", dzi_path)
+        return dzi_path
+    except Exception as e:
+        print(f"Error generating tile pyramid for {img_path}: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return None
+    finally:
+        with _in_progress_lock:
+            _in_progress.discard(img_path)
@@ -0,0 +1,140 @@
+import base64
+import datetime
+import json
+import time
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, func, literal, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Chiến lược đếm tổng số dòng cho các API phân trang
+#   exact     : SELECT count(*) chính xác (mặc định, như cũ)
+#   estimated : ước lượng từ planner (EXPLAIN), gần như miễn phí
+#   cached    : count chính xác nhưng cache COUNT_CACHE_TTL giây theo bộ filter
+#   none      : không đếm, chỉ trả has_more
+COUNT_MODES = ("exact", "estimated", "cached", "none")
+COUNT_MODE_PATTERN = "^(exact|estimated|cached|none)$"
+COUNT_CACHE_TTL = 10.0
+COUNT_CACHE_MAX_ENTRIES = 1000
+
+_count_cache: Dict[Hashable, Tuple[float, int]] = {}
+
+
+def sort_expression(model, sort_by: str):
+    """Cột sort; cột nullable được coalesce để so sánh tuple (keyset) không gặp NULL."""
+    column = getattr(model, sort_by)
+    if sort_by != "id" and column.nullable:
+        # Hằng '' viết thẳng (không bind) để khớp expression index coalesce(col, '')
+        return func.coalesce(column, literal_column("''"))
+    return column
+
+
+def sort_value(row, sort_by: str) -> Any:
+    value = getattr(row, sort_by)
+    return "" if value is None else value
+
+
+def encode_cursor(sort_by: str, order: str, value: Any, row_id: int) -> str:
+    """Cursor mờ (opaque) chứa khoá sort + id của dòng cuối trang."""
+    payload = json.dumps({"s": sort_by, "o": order, "v": value, "id": row_id}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value, row_id = payload["v"], int(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("s") != sort_by or payload.get("o") != order:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/order")
+    return value, row_id
+
+
+def _coerce_cursor_value(value: Any, column_type) -> Any:
+    # Cursor lưu datetime dạng chuỗi ISO, asyncpg cần đúng kiểu datetime khi bind
+    if isinstance(column_type, DateTime) and isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def apply_keyset(stmt, model, sort_by: str, order: str, cursor: Optional[str]):
+    """
+    Sắp xếp theo (sort_by, id) và nếu có cursor thì lấy các dòng đứng sau cursor.
+    Dùng so sánh tuple (row value) nên trang thứ N tốn như trang đầu, không OFFSET,
+    và không bị trùng/sót dòng khi có bản ghi mới chèn vào giữa các lần gọi.
+    """
+    expression = sort_expression(model, sort_by)
+    descending = order == "desc"
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_by, order)
+        value = _coerce_cursor_value(value, expression.type)
+        if sort_by == "id":
+            stmt = stmt.where(model.id < row_id if descending else model.id > row_id)
+        else:
+            key = tuple_(expression, model.id)
+            bound = tuple_(literal(value, type_=expression.type), literal(row_id))
+            stmt = stmt.where(key < bound if descending else key > bound)
+    if sort_by == "id":
+        return stmt.order_by(model.id.desc() if descending else model.id.asc())
+    if descending:
+        return stmt.order_by(expression.desc(), model.id.desc())
+    return stmt.order_by(expression.asc(), model.id.asc())
+
+
+def next_cursor(rows: Sequence, sort_by: str, order: str, size: int) -> Optional[str]:
+    """Cursor cho trang kế tiếp, None nếu đã hết dữ liệu."""
+    if len(rows) < size or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(sort_by, order, sort_value(last, sort_by), last.id)
+
+
+async def exact_count(session: AsyncSession, stmt) -> int:
+    result = await session.execute(select(func.count()).select_from(stmt.subquery()))
+    return result.scalar() or 0
+
+
+async def estimated_count(session: AsyncSession, stmt) -> int:
+    """Số dòng planner ước lượng cho stmt (EXPLAIN, không thực thi câu query)."""
+    compiled = stmt.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True})
+    connection = await session.connection()
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def cached_count(session: AsyncSession, stmt, signature: Hashable) -> int:
+    now = time.monotonic()
+    cached = _count_cache.get(signature)
+    if cached and cached[0] > now:
+        return cached[1]
+    total = await exact_count(session, stmt)
+    if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+        for key in [key for key, (expires, _) in _count_cache.items() if expires <= now]:
+            _count_cache.pop(key, None)
+        if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+    _count_cache[signature] = (now + COUNT_CACHE_TTL, total)
+    return total
+
+
+async def count_rows(session: AsyncSession, stmt, mode: str, signature: Hashable) -> Optional[int]:
+    """
+    Đếm tổng số dòng của stmt (đã có filter, chưa sort/paginate) theo chiến lược mode.
+    signature: khoá nhận diện bộ filter, dùng cho mode "cached". Trả None với mode "none".
+    """
+    if mode == "none":
+        return None
+    if mode == "estimated":
+        return await estimated_count(session, stmt)
+    if mode == "cached":
+        return await cached_count(session, stmt, signature)
+    return await exact_count(session, stmt)
@@ -0,0 +1,62 @@
+import datetime
+from typing import Any, Iterable, List, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from func.fast_json import FastJSONResponse
+
+# msgpack không bắt buộc: thiếu thì luôn trả JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _msgpack_default(value: Any):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+
+def table_columns(model) -> List:
+    return list(model.__table__.columns)
+
+
+def projected_columns(model, fields: Optional[str], required: Iterable[str] = ("id",)) -> Optional[List]:
+    """
+    Chuyển fields="id,timestamp,location" thành danh sách cột để SELECT.
+    Luôn kèm các cột required (id, cột sort) vì keyset cursor cần chúng. None nếu không truyền fields.
+    """
+    if not fields:
+        return None
+    columns = model.__table__.columns
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    for name in required:
+        if name not in names:
+            names.insert(0, name)
+    return [columns[name] for name in names]
+
+
+def wants_msgpack(request: Request) -> bool:
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def negotiated_response(request: Request, content: Any, headers: Optional[dict] = None) -> Response:
+    """
+    Trả content dạng MessagePack nếu client gửi Accept: application/msgpack (và có cài msgpack),
+    ngược lại JSON như bình thường. Datetime có múi giờ được đóng gói bằng timestamp extension của msgpack.
+    """
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if wants_msgpack(request):
+        body = msgpack.packb(content, datetime=True, default=_msgpack_default)
+        return Response(content=body, media_type="application/msgpack", headers=headers)
+    return FastJSONResponse(content=content, headers=headers)
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from func.projection import wants_msgpack
+from func.table_version import table_versions
+
+DEFAULT_TTL = 2.0
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class _CachedResponse:
+    __slots__ = ("expires_at", "versions", "status_code", "body", "headers", "media_type")
+
+    def __init__(self, expires_at: float, versions: Tuple[int, ...], response: Response):
+        self.expires_at = expires_at
+        self.versions = versions
+        self.status_code = response.status_code
+        self.body = response.body
+        self.headers = [
+            (name, value) for name, value in response.raw_headers if name.lower() != b"content-length"
+        ]
+        self.media_type = response.media_type
+
+    def to_response(self) -> Response:
+        response = Response(content=self.body, status_code=self.status_code, media_type=self.media_type)
+        response.raw_headers = [
+            (name, value) for name, value in response.raw_headers if name.lower() == b"content-length"
+        ] + self.headers
+        return response
+
+
+class ResponseCache:
+    """
+    Cache response (đã serialize) của các GET được poll liên tục, key = path + query đã chuẩn hoá
+    + định dạng (JSON / msgpack). TTL ngắn; entry hết hiệu lực ngay khi version của bảng
+    liên quan tăng (table_versions.bump sau mỗi lần ghi).
+    Nhiều request giống nhau cùng miss thì chỉ một request query DB, các request khác chờ kết quả đó.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: Dict[Hashable, _CachedResponse] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(request: Request) -> Hashable:
+        query = tuple(sorted(request.query_params.multi_items()))
+        return request.url.path, query, "msgpack" if wants_msgpack(request) else "json"
+
+    async def get_or_compute(
+        self,
+        request: Request,
+        tables: Iterable[str],
+        compute: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        tables = tuple(tables)
+        key = self.key(request)
+        versions = tuple(table_versions.get(table) for table in tables)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now and entry.versions == versions:
+                self.hits += 1
+                return entry.to_response()
+            self._remove(key)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            entry = await asyncio.shield(inflight)
+            return entry.to_response() if entry is not None else await compute()
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await compute()
+        except asyncio.CancelledError:
+            # Request dẫn đầu bị huỷ (client ngắt): các request đang chờ tự query lại
+            future.set_result(None)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # đánh dấu đã đọc, tránh warning khi không có ai chờ
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        entry = None
+        # Chỉ cache response 200 có body dựng sẵn (không cache 304, lỗi, StreamingResponse)
+        if response.status_code == 200 and isinstance(getattr(response, "body", None), bytes):
+            entry = _CachedResponse(time.monotonic() + self.ttl, versions, response)
+            self._store(key, entry)
+        future.set_result(entry)
+        return response
+
+    def _store(self, key: Hashable, entry: _CachedResponse):
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            "ttl_seconds": self.ttl,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def configure_response_cache(ttl: Optional[float] = None):
+    if ttl is not None:
+        response_cache.ttl = float(ttl)
@@ -0,0 +1,97 @@
+import hashlib
+import os
+from typing import Optional
+from urllib.parse import parse_qs
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+STATIC_DIR = "static"
+
+# Các thư mục chứa file bằng chứng (ảnh/video/log) và ảnh dẫn xuất - ghi một lần, không bao giờ sửa
+EVIDENCE_PREFIXES = ("alarms/", "worker-events/", "error-detail/", "sprites/")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# Tiles deep-zoom nằm trong thư mục "<ảnh>_files/", thư mục được publish một lần (rename) nên tile bất biến
+PYRAMID_TILE_MARKER = "_files/"
+
+
+def evidence_version(relative_path: str, stat_result: os.stat_result) -> str:
+    """
+    Version ngắn của một file bằng chứng, dựng từ path + size + mtime.
+    File không bao giờ bị ghi đè nên không cần hash nội dung (tránh đọc cả video).
+    """
+    key = f"{relative_path}:{stat_result.st_size}:{stat_result.st_mtime_ns}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def versioned_url(stored_path: Optional[str]) -> Optional[str]:
+    """
+    Chuyển path lưu trong DB ("static/alarms/...") thành URL có version
+    ("/static/alarms/...?v=<hash>") để browser/proxy cache vĩnh viễn.
+    """
+    if not stored_path:
+        return None
+    stored_path = stored_path.lstrip("/")
+    relative_path = stored_path[len(STATIC_DIR) + 1:] if stored_path.startswith(f"{STATIC_DIR}/") else stored_path
+    try:
+        stat_result = os.stat(os.path.join(STATIC_DIR, relative_path))
+    except OSError:
+        return f"/{stored_path}"
+    return f"/{STATIC_DIR}/{relative_path}?v={evidence_version(relative_path, stat_result)}"
+
+
+# Cột lưu đường dẫn file bằng chứng của Alarm / WorkerEvent
+EVIDENCE_PATH_FIELDS = ("img_error", "video_error", "ai_log_path", "metadata_path")
+
+
+def with_evidence_urls(row: dict) -> dict:
+    """
+    Thêm "<cột>_url" (URL có version của versioned_url) cạnh mỗi cột đường dẫn bằng chứng có trong row,
+    để thumbnail của danh sách được cache immutable thay vì revalidate mỗi lần xem.
+    Cột đường dẫn gốc giữ nguyên cho client cũ.
+    """
+    for field in EVIDENCE_PATH_FIELDS:
+        if field in row:
+            row[f"{field}_url"] = versioned_url(row[field])
+    return row
+
+
+class EvidenceStaticFiles(StaticFiles):
+    """
+    StaticFiles cho thư mục static với ETag mạnh và Cache-Control cho file bằng chứng.
+
+    - URL có ?v=<version> đúng   -> Cache-Control: immutable (1 năm)
+    - Tile deep-zoom (<ảnh>_files/) -> immutable, viewer tự dựng URL nên không có version
+    - URL không có version       -> no-cache, browser revalidate bằng If-None-Match (304)
+    - File ngoài EVIDENCE_PREFIXES giữ nguyên hành vi mặc định của Starlette
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        relative_path = self.get_path(scope).replace(os.sep, "/")
+        if status_code == 200 and relative_path.startswith(EVIDENCE_PREFIXES):
+            version = evidence_version(relative_path, stat_result)
+            response.headers["etag"] = f'"{version}"'
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            if query.get("v", [None])[0] == version or PYRAMID_TILE_MARKER in relative_path:
+                response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            else:
+                response.headers["cache-control"] = REVALIDATE_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
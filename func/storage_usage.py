@@ -0,0 +1,173 @@
+import asyncio
+import datetime
+import os
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import delete, select
+
+from model.db_model import StorageUsage, async_session_maker
+
+STATIC_DIR = "static"
+STORAGE_CATEGORIES = ("alarms", "worker-events", "error-detail")
+RECONCILE_BATCH_SIZE = 1000
+
+
+def file_sizes(paths: Iterable[Optional[str]]) -> Tuple[int, int]:
+    """Tổng dung lượng và số file của các đường dẫn (bỏ qua None / file không tồn tại)."""
+    total_bytes, file_count = 0, 0
+    for path in paths:
+        if not path:
+            continue
+        try:
+            total_bytes += os.path.getsize(path)
+            file_count += 1
+        except OSError:
+            pass
+    return total_bytes, file_count
+
+
+async def record_usage(
+    session: AsyncSession,
+    category: str,
+    camera_id: Optional[Union[int, str]],
+    day: datetime.date,
+    bytes_delta: int,
+    files_delta: int,
+):
+    """
+    Cộng dồn (hoặc trừ đi, với delta âm khi xoá file) dung lượng vào bảng StorageUsage.
+    Chạy trong session của request, commit cùng với bản ghi event.
+    """
+    if not bytes_delta and not files_delta:
+        return
+    stmt = insert(StorageUsage).values(
+        camera_id="" if camera_id is None else str(camera_id),
+        category=category,
+        day=day,
+        total_bytes=bytes_delta,
+        file_count=files_delta,
+        updated_at=datetime.datetime.now(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StorageUsage.camera_id, StorageUsage.category, StorageUsage.day],
+        set_={
+            "total_bytes": StorageUsage.total_bytes + stmt.excluded.total_bytes,
+            "file_count": StorageUsage.file_count + stmt.excluded.file_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await session.execute(stmt)
+
+
+def scan_storage(static_dir: str = STATIC_DIR) -> Dict[Tuple[str, str, datetime.date], Tuple[int, int]]:
+    """
+    Quét static/<category>/<YYYY-MM-DD>/[camera_<id>/] để tính lại dung lượng thực tế.
+    Hàm blocking, chỉ dùng cho job reconcile.
+    """
+    usage: Dict[Tuple[str, str, datetime.date], Tuple[int, int]] = {}
+    for category in STORAGE_CATEGORIES:
+        category_dir = os.path.join(static_dir, category)
+        if not os.path.isdir(category_dir):
+            continue
+        for day_entry in os.scandir(category_dir):
+            if not day_entry.is_dir():
+                continue
+            try:
+                day = datetime.datetime.strptime(day_entry.name, "%Y-%m-%d").date()
+            except ValueError:
+                continue
+            for root, _, files in os.walk(day_entry.path):
+                if not files:
+                    continue
+                relative = os.path.relpath(root, day_entry.path).split(os.sep)[0]
+                camera_id = relative[len("camera_"):] if relative.startswith("camera_") else ""
+                total_bytes, file_count = file_sizes(os.path.join(root, name) for name in files)
+                key = (camera_id, category, day)
+                old_bytes, old_count = usage.get(key, (0, 0))
+                usage[key] = (old_bytes + total_bytes, old_count + file_count)
+    return usage
+
+
+async def _usage_rows(session: AsyncSession) -> Dict[Tuple[str, str, datetime.date], Tuple[int, int]]:
+    result = await session.execute(select(
+        StorageUsage.camera_id, StorageUsage.category, StorageUsage.day,
+        StorageUsage.total_bytes, StorageUsage.file_count,
+    ))
+    return {(row.camera_id, row.category, row.day): (row.total_bytes, row.file_count) for row in result.all()}
+
+
+async def reconcile_storage_usage() -> Dict[str, int]:
+    """
+    Thay StorageUsage bằng kết quả quét đĩa mà không làm mất delta của record_usage chạy song song.
+
+    Đọc bảng (baseline) trước khi quét, quét đĩa (không khoá - có thể lâu), rồi trong một transaction
+    khoá bảng (SHARE ROW EXCLUSIVE, record_usage chờ tới khi commit) và ghi
+    kết quả quét + (giá trị hiện tại - baseline): delta commit trong lúc quét được cộng lại.
+    So sánh theo giá trị nên không phụ thuộc đồng hồ / timezone của updated_at.
+    """
+    async with async_session_maker() as session:
+        baseline = await _usage_rows(session)
+    loop = asyncio.get_running_loop()
+    usage = await loop.run_in_executor(None, scan_storage, STATIC_DIR)
+
+    async with async_session_maker() as session:
+        await session.execute(text("LOCK TABLE storageusage IN SHARE ROW EXCLUSIVE MODE"))
+        current = await _usage_rows(session)
+        for key, (total_bytes, file_count) in current.items():
+            old_bytes, old_count = baseline.get(key, (0, 0))
+            if (total_bytes, file_count) != (old_bytes, old_count):
+                scanned_bytes, scanned_count = usage.get(key, (0, 0))
+                usage[key] = (scanned_bytes + total_bytes - old_bytes, scanned_count + file_count - old_count)
+        # Dòng không còn file (không có trong kết quả quét, không đổi trong lúc quét) bị xoá
+        usage = {key: value for key, value in usage.items() if key in current or value != (0, 0)}
+        stale = [key for key in current if key not in usage]
+
+        now = datetime.datetime.now()
+        rows = [
+            {
+                "camera_id": camera_id,
+                "category": category,
+                "day": day,
+                "total_bytes": total_bytes,
+                "file_count": file_count,
+                "updated_at": now,
+            }
+            for (camera_id, category, day), (total_bytes, file_count) in usage.items()
+        ]
+        for start in range(0, len(rows), RECONCILE_BATCH_SIZE):
+            stmt = insert(StorageUsage).values(rows[start:start + RECONCILE_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[StorageUsage.camera_id, StorageUsage.category, StorageUsage.day],
+                set_={
+                    "total_bytes": stmt.excluded.total_bytes,
+                    "file_count": stmt.excluded.file_count,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            await session.execute(stmt)
+        for start in range(0, len(stale), RECONCILE_BATCH_SIZE):
+            await session.execute(delete(StorageUsage).where(
+                tuple_(StorageUsage.camera_id, StorageUsage.category, StorageUsage.day).in_(stale[start:start + RECONCILE_BATCH_SIZE])
+            ))
+        await session.commit()
+    return {
+        "rows": len(rows),
+        "total_bytes": sum(row["total_bytes"] for row in rows),
+        "file_count": sum(row["file_count"] for row in rows),
+    }
+
+
+async def storage_reconcile_loop(interval_hours: float):
+    """Task nền: reconcile định kỳ để sửa sai lệch (file bị xoá tay, tile pyramid sinh sau...)."""
+    while True:
+        try:
+            result = await reconcile_storage_usage()
+            print(f"Storage usage reconciled: {result}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error reconciling storage usage: {e}")
+        await asyncio.sleep(interval_hours * 3600)
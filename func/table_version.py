@@ -0,0 +1,65 @@
+import hashlib
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+# ETag đổi sau mỗi lần khởi động (bộ đếm version nằm trong RAM, bắt đầu lại từ 0)
+BOOT_ID = uuid.uuid4().hex
+# Client được giữ bản cache nhưng phải hỏi lại (If-None-Match) mỗi lần dùng
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+class TableVersions:
+    """
+    Bộ đếm version theo bảng, tăng sau mỗi lần ghi (sau commit).
+    ETag của các endpoint đọc suy ra từ version của các bảng mà response phụ thuộc,
+    nên kiểm tra If-None-Match không cần query dữ liệu.
+
+    Chỉ đúng trong một process (giống hot set alarm): nhiều worker uvicorn thì mỗi worker
+    chỉ thấy lần ghi của chính nó.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = defaultdict(int)
+
+    def bump(self, *tables: str):
+        for table in tables:
+            self._versions[table] += 1
+
+    def get(self, table: str) -> int:
+        return self._versions[table]
+
+    def etag(self, tables: Iterable[str], *extra) -> str:
+        parts = [BOOT_ID] + [f"{table}:{self._versions[table]}" for table in tables] + [str(part) for part in extra]
+        return '"' + hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+table_versions = TableVersions()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def conditional_get(request: Request, tables: Iterable[str], *extra) -> Tuple[str, Optional[Response]]:
+    """
+    Tính ETag cho request (path + query đã chuẩn hoá + version các bảng + extra).
+    Trả (etag, Response 304) nếu client đã có bản mới nhất, ngược lại (etag, None).
+    """
+    query = sorted(request.query_params.multi_items())
+    etag = table_versions.etag(tables, request.url.path, query, *extra)
+    if etag_matches(request, etag):
+        return etag, Response(status_code=304, headers=etag_headers(etag))
+    return etag, None
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
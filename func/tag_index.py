@@ -0,0 +1,89 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from model.db_model import CameraConfigTagLink, async_session_maker
+
+
+def bitset_ids(bits: int) -> List[int]:
+    """Danh sách id (tăng dần) của các bit đang bật."""
+    ids = []
+    while bits:
+        lowest = bits & -bits
+        ids.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return ids
+
+
+class TagIndex:
+    """
+    Inverted index tag -> tập camera_id (bitset dạng int, bit thứ i = camera id i), giữ trong RAM.
+    Lọc camera theo nhiều tag = AND các bitset, không cần subquery cho từng tag.
+    Build từ CameraConfigTagLink khi khởi động, cập nhật bởi CRUD camera / tag.
+
+    Chỉ đúng trong một process (giống hot set alarm).
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._cameras_by_tag: Dict[int, int] = {}
+        self._tags_by_camera: Dict[int, Set[int]] = {}
+
+    async def rebuild(self, session: Optional[AsyncSession] = None):
+        if session is None:
+            async with async_session_maker() as own_session:
+                return await self.rebuild(own_session)
+        result = await session.execute(select(CameraConfigTagLink.camera_config_id, CameraConfigTagLink.tag_id))
+        cameras_by_tag: Dict[int, int] = {}
+        tags_by_camera: Dict[int, Set[int]] = {}
+        for camera_id, tag_id in result.all():
+            cameras_by_tag[tag_id] = cameras_by_tag.get(tag_id, 0) | (1 << camera_id)
+            tags_by_camera.setdefault(camera_id, set()).add(tag_id)
+        self._cameras_by_tag = cameras_by_tag
+        self._tags_by_camera = tags_by_camera
+        self.ready = True
+
+    def set_camera_tags(self, camera_id: int, tag_ids: Iterable[int]):
+        """Thay toàn bộ tag của một camera (sau khi tạo / sửa camera đã commit)."""
+        self.remove_camera(camera_id)
+        tag_ids = set(tag_ids)
+        for tag_id in tag_ids:
+            self._cameras_by_tag[tag_id] = self._cameras_by_tag.get(tag_id, 0) | (1 << camera_id)
+        if tag_ids:
+            self._tags_by_camera[camera_id] = tag_ids
+
+    def remove_camera(self, camera_id: int):
+        mask = ~(1 << camera_id)
+        for tag_id in self._tags_by_camera.pop(camera_id, ()):
+            bits = self._cameras_by_tag.get(tag_id, 0) & mask
+            if bits:
+                self._cameras_by_tag[tag_id] = bits
+            else:
+                self._cameras_by_tag.pop(tag_id, None)
+
+    def remove_tag(self, tag_id: int):
+        for camera_id in bitset_ids(self._cameras_by_tag.pop(tag_id, 0)):
+            tags = self._tags_by_camera.get(camera_id)
+            if tags is not None:
+                tags.discard(tag_id)
+                if not tags:
+                    del self._tags_by_camera[camera_id]
+
+    def camera_ids(self, tag_ids: Iterable[int]) -> Optional[List[int]]:
+        """
+        Id các camera có đủ tất cả tag_ids (tăng dần).
+        Trả None khi index chưa build xong, để caller dùng SQL thay thế.
+        """
+        if not self.ready:
+            return None
+        bits = None
+        for tag_id in set(tag_ids):
+            tag_bits = self._cameras_by_tag.get(tag_id, 0)
+            bits = tag_bits if bits is None else bits & tag_bits
+            if not bits:
+                return []
+        return bitset_ids(bits) if bits else []
+
+
+tag_index = TagIndex()
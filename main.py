@@ -6,11 +6,12 @@ from fastapi.staticfiles import StaticFiles  # Add this import
 from fastapi.middleware.cors import CORSMiddleware  # Add this import
 from func.api_router.v1.camera_router import router
 from func.api_gateway import create_app
+from func.static_router.v1.evidence_static import EvidenceStaticFiles, versioned_url
 
 app = create_app()
 
 # Mount the static directory to serve files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", EvidenceStaticFiles(directory="static"), name="static")
 
 # Add CORS middleware
 app.add_middleware(
@@ -53,7 +54,7 @@ async def browse_alarm_files(alarm_uuid: str):
                                         files.append({
                                             "filename": f.name,
                                             "path": f"static/{relative_path}",
-                                            "url": f"/static/{relative_path}",
+                                            "url": versioned_url(f"static/{relative_path.as_posix()}"),
                                             "size": f.stat().st_size,
                                             "type": f.suffix.lower()
                                         })
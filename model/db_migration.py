@@ -0,0 +1,276 @@
+"""
+Migration schema có quản lý cho PostgreSQL.
+
+create_all chỉ tạo bảng mới, không thêm index/cột cho bảng đã có dữ liệu, nên mọi thay đổi
+schema trên bảng cũ đi qua đây. Mỗi migration chạy đúng một lần theo thứ tự version,
+version đã chạy được ghi trong bảng schemamigration. Advisory lock đảm bảo chỉ một
+process chạy migration khi nhiều worker khởi động cùng lúc.
+"""
+from typing import Awaitable, Callable, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from func.event_rollup import rebuild_rollups
+from model.db_model import async_engine
+
+MIGRATION_LOCK_KEY = 7216_0001
+BACKFILL_BATCH_SIZE = 5000
+
+
+async def execute_autocommit(engine: AsyncEngine, statements: Iterable[str]):
+    """Chạy từng câu lệnh ngoài transaction (bắt buộc với CREATE INDEX CONCURRENTLY)."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in statements:
+            await conn.execute(text(statement))
+
+
+async def _keyset_indexes(engine: AsyncEngine):
+    # Index (sort key, id) cho phân trang keyset của /worker-events, /alarms, /error-detail
+    await execute_autocommit(engine, [
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_timestamp_id ON workerevent ("timestamp", id)',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_status_id ON workerevent (status, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_location_id ON workerevent (location, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_error_detail_id ON workerevent (error_detail, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_camera_name_id ON workerevent ((coalesce(camera_name, '')), id)",
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_errordetail_timestamp_id ON errordetail ("timestamp", id)',
+    ])
+
+
+async def _trigram_search_indexes(engine: AsyncEngine):
+    # GIN pg_trgm cho các filter ILIKE '%...%' (query, error_code, location, ...)
+    # camera_id chỉ còn là chuỗi trên DB cũ (migration 7 đổi sang integer FK và xoá index này);
+    # DB tạo mới bằng create_all đã có camera_id integer, không tạo được index trigram
+    camera_id_index = []
+    if await _column_type(engine, "workerevent", "camera_id") != "integer":
+        camera_id_index = [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_camera_id_trgm ON workerevent USING gin (camera_id gin_trgm_ops)",
+        ]
+    await execute_autocommit(engine, [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        *camera_id_index,
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_camera_name_trgm ON workerevent USING gin (camera_name gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_error_detail_trgm ON workerevent USING gin (error_detail gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_location_trgm ON workerevent USING gin (location gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alarm_camera_name_trgm ON alarm USING gin (camera_name gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alarm_error_detail_trgm ON alarm USING gin (error_detail gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alarm_location_trgm ON alarm USING gin (location gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_errordetail_location_trgm ON errordetail USING gin (location gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_errordetail_owner_trgm ON errordetail USING gin (owner gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_errordetail_error_name_trgm ON errordetail USING gin (error_name gin_trgm_ops)",
+    ])
+
+
+async def _event_id_prefix_index(engine: AsyncEngine):
+    # Cột sinh ảo id::varchar (expression index) cho filter event_id dạng exact/prefix.
+    # Dùng expression index thay vì cột GENERATED STORED để không phải rewrite cả bảng.
+    await execute_autocommit(engine, [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_id_text ON workerevent ((CAST(id AS VARCHAR)) varchar_pattern_ops)",
+    ])
+
+
+async def _column_type(engine: AsyncEngine, table: str, column: str):
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT data_type FROM information_schema.columns WHERE table_name = :table AND column_name = :column"),
+            {"table": table, "column": column},
+        )
+        return result.scalar()
+
+
+async def _backfill_in_batches(engine: AsyncEngine, statement: str):
+    """Chạy UPDATE theo lô (mỗi lô một transaction ngắn) cho tới khi không còn dòng nào."""
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(text(statement), {"batch": BACKFILL_BATCH_SIZE})
+        if result.rowcount == 0:
+            break
+
+
+async def _timestamp_to_timestamptz(engine: AsyncEngine, table: str):
+    """
+    Đổi cột "timestamp" kiểu chuỗi '%Y-%m-%d %H:%M:%S' (giờ địa phương) sang timestamptz, online:
+    thêm cột mới + trigger đồng bộ, backfill theo lô, validate NOT NULL bằng CHECK NOT VALID,
+    cuối cùng đổi tên cột trong một transaction ngắn.
+    Chuỗi cũ được hiểu theo TimeZone của session PostgreSQL; chuỗi không đọc được -> epoch 0.
+    """
+    if await _column_type(engine, table, "timestamp") == "timestamp with time zone":
+        return
+    await execute_autocommit(engine, [
+        """CREATE OR REPLACE FUNCTION legacy_text_to_timestamptz(value text) RETURNS timestamptz AS $$
+        BEGIN
+            RETURN CAST(value AS timestamptz);
+        EXCEPTION WHEN others THEN
+            RETURN to_timestamp(0);
+        END $$ LANGUAGE plpgsql STABLE""",
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS timestamp_tz timestamptz",
+        f"""CREATE OR REPLACE FUNCTION {table}_timestamp_tz_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.timestamp_tz := legacy_text_to_timestamptz(NEW."timestamp");
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql""",
+        f"DROP TRIGGER IF EXISTS {table}_timestamp_tz_sync ON {table}",
+        f"""CREATE TRIGGER {table}_timestamp_tz_sync BEFORE INSERT OR UPDATE OF "timestamp" ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {table}_timestamp_tz_sync()""",
+    ])
+    await _backfill_in_batches(engine, f"""
+        UPDATE {table} SET timestamp_tz = legacy_text_to_timestamptz("timestamp")
+        WHERE id IN (SELECT id FROM {table} WHERE timestamp_tz IS NULL LIMIT :batch)
+    """)
+    await execute_autocommit(engine, [
+        f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_timestamp_tz_not_null",
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_timestamp_tz_not_null CHECK (timestamp_tz IS NOT NULL) NOT VALID",
+        f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_timestamp_tz_not_null",
+    ])
+    async with engine.begin() as conn:
+        for statement in [
+            f"DROP TRIGGER {table}_timestamp_tz_sync ON {table}",
+            f"DROP FUNCTION {table}_timestamp_tz_sync()",
+            f'ALTER TABLE {table} DROP COLUMN "timestamp"',
+            f'ALTER TABLE {table} RENAME COLUMN timestamp_tz TO "timestamp"',
+            # CHECK đã validate nên SET NOT NULL không phải quét lại bảng
+            f'ALTER TABLE {table} ALTER COLUMN "timestamp" SET NOT NULL',
+            f"ALTER TABLE {table} DROP CONSTRAINT {table}_timestamp_tz_not_null",
+        ]:
+            await conn.execute(text(statement))
+
+
+async def _event_timestamptz(engine: AsyncEngine):
+    for table in ("alarm", "workerevent", "errordetail"):
+        await _timestamp_to_timestamptz(engine, table)
+    # Index cũ trên cột chuỗi đã bị drop cùng cột: tạo lại keyset index + BRIN cho truy vấn theo khoảng thời gian
+    await execute_autocommit(engine, [
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_timestamp_id ON workerevent ("timestamp", id)',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_errordetail_timestamp_id ON errordetail ("timestamp", id)',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alarm_timestamp_brin ON alarm USING brin ("timestamp")',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_workerevent_timestamp_brin ON workerevent USING brin ("timestamp")',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_errordetail_timestamp_brin ON errordetail USING brin ("timestamp")',
+        "DROP FUNCTION IF EXISTS legacy_text_to_timestamptz(text)",
+    ])
+
+
+async def _unconfirmed_alarm_index(engine: AsyncEngine):
+    # Partial index chỉ chứa alarm chưa xác nhận, khớp ORDER BY của /alarms/unconfirmed và /alarms/latest
+    await execute_autocommit(engine, [
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alarm_unconfirmed_timestamp ON alarm ("timestamp" DESC, id DESC) WHERE is_confirmed = false',
+    ])
+
+
+async def _event_rollup_backfill(engine: AsyncEngine):
+    # Bảng eventrollup mới do create_all tạo (rỗng): tính lần đầu từ dữ liệu alarm / workerevent đã có
+    # (khoá chính bắt đầu bằng source, hour nên không cần thêm index cho truy vấn theo khoảng thời gian)
+    async with AsyncSession(engine) as session:
+        await rebuild_rollups(session)
+
+
+async def _backfill_id_ranges(engine: AsyncEngine, table: str, statement: str):
+    """
+    Chạy UPDATE theo khoảng id (mỗi khoảng một transaction ngắn) tới id lớn nhất lúc bắt đầu;
+    dòng chèn sau đó đã được trigger đồng bộ. statement dùng :start, :stop.
+    """
+    async with engine.connect() as conn:
+        max_id = (await conn.execute(text(f"SELECT max(id) FROM {table}"))).scalar() or 0
+    start = 0
+    while start < max_id:
+        async with engine.begin() as conn:
+            await conn.execute(text(statement), {"start": start, "stop": start + BACKFILL_BATCH_SIZE})
+        start += BACKFILL_BATCH_SIZE
+
+
+async def _camera_id_to_foreign_key(engine: AsyncEngine, table: str):
+    """
+    Đổi cột camera_id kiểu chuỗi sang integer FK tới cameraconfig.id (ON DELETE SET NULL), online:
+    thêm cột mới + trigger đồng bộ, backfill theo khoảng id, FK NOT VALID rồi VALIDATE,
+    index tạo CONCURRENTLY, cuối cùng đổi tên cột trong một transaction ngắn.
+    Giá trị không phải số hoặc không khớp camera nào -> NULL (tên camera vẫn còn ở camera_name).
+    """
+    if await _column_type(engine, table, "camera_id") == "integer":
+        return
+    await execute_autocommit(engine, [
+        """CREATE OR REPLACE FUNCTION legacy_camera_ref(value text) RETURNS integer AS $$
+            SELECT id FROM cameraconfig
+            WHERE id = CASE WHEN btrim(value) ~ '^[0-9]{1,9}$' THEN CAST(btrim(value) AS integer) END
+        $$ LANGUAGE sql STABLE""",
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS camera_ref integer",
+        f"""CREATE OR REPLACE FUNCTION {table}_camera_ref_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.camera_ref := legacy_camera_ref(NEW.camera_id);
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql""",
+        f"DROP TRIGGER IF EXISTS {table}_camera_ref_sync ON {table}",
+        f"""CREATE TRIGGER {table}_camera_ref_sync BEFORE INSERT OR UPDATE OF camera_id ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {table}_camera_ref_sync()""",
+    ])
+    await _backfill_id_ranges(engine, table, f"""
+        UPDATE {table} SET camera_ref = legacy_camera_ref(camera_id)
+        WHERE id > :start AND id <= :stop AND camera_ref IS DISTINCT FROM legacy_camera_ref(camera_id)
+    """)
+    await execute_autocommit(engine, [
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_camera_ref ON {table} (camera_ref)",
+        f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_camera_ref_fkey",
+        f"""ALTER TABLE {table} ADD CONSTRAINT {table}_camera_ref_fkey FOREIGN KEY (camera_ref)
+        REFERENCES cameraconfig (id) ON DELETE SET NULL NOT VALID""",
+        f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_camera_ref_fkey",
+        # Index trigram trên cột chuỗi cũ không còn dùng (filter theo id giờ là so sánh số nguyên)
+        f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_camera_id_trgm",
+    ])
+    async with engine.begin() as conn:
+        for statement in [
+            f"DROP TRIGGER {table}_camera_ref_sync ON {table}",
+            f"DROP FUNCTION {table}_camera_ref_sync()",
+            f"ALTER TABLE {table} DROP COLUMN camera_id",
+            f"ALTER TABLE {table} RENAME COLUMN camera_ref TO camera_id",
+            # Đặt lại tên giống index / FK mà create_all tạo cho DB mới
+            f"ALTER INDEX ix_{table}_camera_ref RENAME TO ix_{table}_camera_id",
+            f"ALTER TABLE {table} RENAME CONSTRAINT {table}_camera_ref_fkey TO {table}_camera_id_fkey",
+        ]:
+            await conn.execute(text(statement))
+
+
+async def _camera_foreign_keys(engine: AsyncEngine):
+    for table in ("alarm", "workerevent"):
+        await _camera_id_to_foreign_key(engine, table)
+    await execute_autocommit(engine, ["DROP FUNCTION IF EXISTS legacy_camera_ref(text)"])
+    # camera_id không khớp camera nào đã thành NULL: tính lại rollup cho khớp ("" thay cho chuỗi cũ)
+    async with AsyncSession(engine) as session:
+        await rebuild_rollups(session)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[AsyncEngine], Awaitable[None]]]] = [
+    (1, "keyset pagination indexes", _keyset_indexes),
+    (2, "pg_trgm search indexes", _trigram_search_indexes),
+    (3, "worker event id prefix index", _event_id_prefix_index),
+    (4, "timestamptz event time columns with BRIN indexes", _event_timestamptz),
+    (5, "partial index on unconfirmed alarms", _unconfirmed_alarm_index),
+    (6, "hourly event rollup backfill", _event_rollup_backfill),
+    (7, "integer camera_id foreign keys on alarm and workerevent", _camera_foreign_keys),
+]
+
+
+async def run_migrations(engine: AsyncEngine = async_engine):
+    """Chạy các migration chưa được áp dụng, theo thứ tự version."""
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            await lock_conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schemamigration ("
+                "version integer PRIMARY KEY, name varchar NOT NULL, "
+                "applied_at timestamptz NOT NULL DEFAULT now())"
+            ))
+            result = await lock_conn.execute(text("SELECT version FROM schemamigration"))
+            applied = {row[0] for row in result.all()}
+
+            for version, name, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+                print(f"Applying migration {version}: {name}")
+                await migrate(engine)
+                await lock_conn.execute(
+                    text("INSERT INTO schemamigration (version, name) VALUES (:version, :name)"),
+                    {"version": version, "name": name},
+                )
+                print(f"Migration {version} applied.")
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
@@ -3,6 +3,7 @@ import os
 from typing import Annotated, Optional, Union, List
 from pydantic import BaseModel, Field as PydanticField
 from sqlmodel import Field, Relationship, Session, SQLModel, create_engine, select
+from sqlalchemy import BigInteger, DateTime
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 import uvicorn
@@ -33,7 +34,7 @@ class ErrorDetailBase(SQLModel):
     location: str = Field(index=True)                   
     owner: Optional[str] = Field(default=None)          
     error_name: Optional[str] = Field(default=None)    
-    timestamp: str    
+    timestamp: datetime.datetime = Field(sa_type=DateTime(timezone=True))  # timestamptz
     image_url: Optional[str] = Field(default=None)      
 
 class ErrorDetail(ErrorDetailBase, table=True):
@@ -70,18 +71,17 @@ class CameraConfigTagLink(SQLModel, table=True):
 class Tag(TagBase, table=True):
     __tablename__ = "tag" # Explicit table name
     id: Optional[int] = Field(default=None, primary_key=True) # Optional for creation
-    # Ensure lazy='selectin' is on the CameraConfig side for loading tags with cameras
-    camera_configs : List["CameraConfig"] = Relationship(back_populates="tags", link_model=CameraConfigTagLink, sa_relationship_kwargs={"lazy": "selectin"}) # Use selectin loading for better performance
+    # Không eager load mặc định: endpoint nào cần camera_configs thì tự selectinload(Tag.camera_configs)
+    camera_configs : List["CameraConfig"] = Relationship(back_populates="tags", link_model=CameraConfigTagLink)
     
 class CameraConfig(CameraConfigBase, table=True):
     __tablename__ = "cameraconfig" # Explicit table name
     id: Optional[int] = Field(default=None, primary_key=True) # Optional for creation
-    # Use selectin loading for tags when a CameraConfig is loaded
+    # Không eager load mặc định (selectin ở cả hai phía làm load dây chuyền camera -> tag -> camera...);
+    # endpoint nào cần tags thì tự selectinload(CameraConfig.tags)
     tags : List[Tag] = Relationship(
         back_populates="camera_configs",
         link_model=CameraConfigTagLink,
-        # sa_relationship_kwargs={"lazy": "joined"} # Use joined loading for better performance
-        sa_relationship_kwargs={"lazy": "selectin"} # Use selectin loading for better performance
     )
     
 # ✅ Fix: CHỈ GIỮ 1 USER CLASS (INHERIT TỪ USERBASE, XÓA STANDALONE TRÊN)
@@ -91,10 +91,11 @@ class User(UserBase, table=True):
     
 class Alarm(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    camera_id: str
+    # FK tới camera (NULL nếu camera đã bị xoá); tên camera lúc ghi nhận vẫn giữ ở camera_name
+    camera_id: Optional[int] = Field(default=None, foreign_key="cameraconfig.id", index=True, ondelete="SET NULL")
     error_detail: str
     location: str
-    timestamp: str
+    timestamp: datetime.datetime = Field(sa_type=DateTime(timezone=True))  # timestamptz
     is_confirmed: bool = Field(default=False)  # Trạng thái đã xác nhận hay chưa
     alarm_uuid: Optional[str] = Field(default=None, index=True)  # UUID unique cho alarm
     metadata_path: Optional[str] = Field(default=None)    # Đường dẫn file metadata JSON
@@ -116,16 +117,43 @@ class AlarmConfirmationLog(SQLModel, table=True):
     
 class WorkerEvent(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    camera_id: str
+    camera_id: Optional[int] = Field(default=None, foreign_key="cameraconfig.id", index=True, ondelete="SET NULL")
     error_detail: str
     location: str
-    timestamp: str
+    timestamp: datetime.datetime = Field(sa_type=DateTime(timezone=True))  # timestamptz
     status: int = Field(default=0)  # 0: Pending, 1: Accept, 2: Decline
     img_error: Optional[str] = Field(default=None, nullable=True)
     video_error: Optional[str] = Field(default=None, nullable=True)
     ai_log_path: Optional[str] = Field(default=None, nullable=True)
     camera_name: Optional[str] = Field(default=None)
 
+class StorageUsage(SQLModel, table=True):
+    """
+    Dung lượng file bằng chứng theo camera / loại / ngày.
+    Cộng dồn khi ingest, job reconcile định kỳ quét lại thư mục static để sửa sai lệch.
+    """
+    __tablename__ = "storageusage"
+    camera_id: str = Field(primary_key=True)          # "" nếu file không gắn camera (error-detail)
+    category: str = Field(primary_key=True)           # alarms | worker-events | error-detail
+    day: datetime.date = Field(primary_key=True)
+    total_bytes: int = Field(default=0, sa_type=BigInteger)
+    file_count: int = Field(default=0)
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+class EventRollup(SQLModel, table=True):
+    """
+    Số event theo giờ × camera × location × error_detail × status, cho dashboard thống kê.
+    Cộng dồn khi ingest / đổi trạng thái; có thể rebuild toàn bộ từ bảng alarm, workerevent.
+    """
+    __tablename__ = "eventrollup"
+    source: str = Field(primary_key=True)             # alarm | worker_event
+    hour: datetime.datetime = Field(primary_key=True, sa_type=DateTime(timezone=True))  # đầu giờ (UTC)
+    camera_id: str = Field(primary_key=True)
+    location: str = Field(primary_key=True)
+    error_detail: str = Field(primary_key=True)
+    status: int = Field(primary_key=True)             # alarm: 0 chưa xác nhận, 1 đã xác nhận; worker_event: 0/1/2
+    event_count: int = Field(default=0)
+
 # Định nghĩa Pydantic model cho request body của API "/worker-events/{worker_event_id}/confirm"
 class AlarmConfirmationRequest(BaseModel):
     employee_confirm_id: str
@@ -137,6 +165,33 @@ class WorkerEventActionRequest(BaseModel):
     action: str  # "OK" hoặc "NG"
     # status: str  # "Pending", "OK", "NG"
 
+# Thao tác hàng loạt: chọn theo danh sách id và/hoặc filter (cùng ý nghĩa với filter của GET /alarms, /worker-events)
+class AlarmBulkFilter(BaseModel):
+    camera_id: Optional[int] = None
+    error_code: Optional[str] = None
+    location: Optional[str] = None
+    start_time: Optional[int] = None # epoch giây
+    end_time: Optional[int] = None
+
+class AlarmBulkConfirmRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    filters: Optional[AlarmBulkFilter] = None
+    employee_confirm_id: str
+
+class WorkerEventBulkFilter(BaseModel):
+    query: Optional[str] = None
+    status: Optional[int] = None
+    event_id: Optional[str] = None
+    error_code: Optional[str] = None
+    location: Optional[str] = None
+    start_time: Optional[int] = None # epoch giây
+    end_time: Optional[int] = None
+
+class WorkerEventBulkActionRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    filters: Optional[WorkerEventBulkFilter] = None
+    action: str  # "OK" hoặc "NG"
+
 # Đơn giản hóa WorkerEventConfirmationLog - bỏ client_ip và employee_confirm_id
 class WorkerEventConfirmationLog(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -197,6 +252,13 @@ class CameraConfigUpdate(BaseModel): # Use Pydantic BaseModel for input validati
     
 class TagUpdate(TagBase):
     pass
+
+class CameraConfigImportRow(CameraConfigCreate):
+    """Một dòng import camera hàng loạt: có id thì cập nhật camera đó, không có thì khớp theo name."""
+    id: Optional[int] = None
+    tags: Optional[List[str]] = None # Tên tag (không dùng id để file dùng được giữa các môi trường)
+    tag_ids: Optional[List[int]] = None
+
 class UserUpdate(BaseModel): # Use Pydantic BaseModel for input validation
     # Allow updating only specific fields for User
     username : Optional[str] = None
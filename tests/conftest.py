@@ -0,0 +1,70 @@
+"""
+Fixture dùng chung cho test cần Postgres.
+
+Test không đụng tới DB dev: mỗi phiên pytest tạo một database tạm (tên ngẫu nhiên) trên cùng server
+với db_connection_string trong config/config.yaml (hoặc TEST_DATABASE_URL nếu có), tạo bảng bằng
+SQLModel.metadata.create_all (không chạy migration / lifespan) và xoá database khi xong.
+Không kết nối được server thì skip.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# model.db_model đọc config/config.yaml theo đường dẫn tương đối
+if not os.path.exists(os.path.join("config", "config.yaml")):
+    os.chdir(REPO_ROOT)
+
+
+def _server_url():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url is None:
+        from model.db_model import DATABASE_URL
+        url = DATABASE_URL
+    return make_url(url)
+
+
+async def _execute_autocommit(url, statement: str):
+    engine = create_async_engine(url, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text(statement))
+    finally:
+        await engine.dispose()
+
+
+async def _create_tables(url):
+    engine = create_async_engine(url, poolclass=NullPool)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def throwaway_database_url():
+    """URL của database tạm đã có đủ bảng; bị xoá sau phiên test."""
+    server_url = _server_url()
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    try:
+        asyncio.run(_execute_autocommit(server_url, f'CREATE DATABASE "{name}"'))
+    except Exception as e:
+        pytest.skip(f"Không tạo được database tạm trên {server_url.render_as_string(hide_password=True)}: {e}")
+    url = server_url.set(database=name)
+    try:
+        asyncio.run(_create_tables(url))
+        yield url
+    finally:
+        asyncio.run(_execute_autocommit(server_url, f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
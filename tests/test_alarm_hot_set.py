@@ -0,0 +1,117 @@
+"""Hot set alarm chưa xác nhận: thứ tự, capacity, và add / discard xảy ra trong lúc seed (không cần DB)."""
+import asyncio
+import datetime
+
+from func.alarm_hot_set import UnconfirmedAlarmSet
+from model.db_model import Alarm
+
+BASE = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _alarm(alarm_id, minute=None, is_confirmed=False):
+    return Alarm(
+        id=alarm_id,
+        timestamp=BASE + datetime.timedelta(minutes=alarm_id if minute is None else minute),
+        is_confirmed=is_confirmed,
+        error_detail="E01",
+        location="LINE-1",
+    )
+
+
+class _Scalars:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return _Scalars(self._rows)
+
+
+class _SlowSession:
+    """Giả session: SELECT nhường event loop (chạy during_query) rồi trả các alarm đã chụp từ DB."""
+
+    def __init__(self, rows, during_query=None):
+        self.rows = rows
+        self.during_query = during_query
+
+    async def execute(self, statement):
+        await asyncio.sleep(0)
+        if self.during_query:
+            self.during_query()
+        # Giống DB: mới nhất trước
+        return _Result(sorted(self.rows, key=lambda alarm: (alarm.timestamp, alarm.id), reverse=True))
+
+
+def _ids(alarms):
+    return [alarm.id for alarm in alarms]
+
+
+def test_not_ready_before_seed():
+    hot_set = UnconfirmedAlarmSet()
+    hot_set.add(_alarm(1))
+    assert hot_set.latest(10) is None and len(hot_set) == 0
+
+
+def test_latest_is_newest_first_with_offset():
+    hot_set = UnconfirmedAlarmSet()
+    asyncio.run(hot_set.seed(_SlowSession([_alarm(i) for i in range(1, 6)])))
+    assert hot_set.complete
+    assert _ids(hot_set.latest(3)) == [5, 4, 3]
+    assert _ids(hot_set.latest(3, offset=3)) == [2, 1]
+    assert hot_set.latest(3, offset=10) == []
+
+
+def test_changes_during_seed_are_replayed():
+    hot_set = UnconfirmedAlarmSet()
+    old = [_alarm(1), _alarm(2), _alarm(3)]
+
+    def concurrent_writes():
+        hot_set.add(_alarm(9))     # tạo sau khi SELECT đã chụp dữ liệu
+        hot_set.discard(2)         # xác nhận alarm đã nằm trong kết quả SELECT
+
+    asyncio.run(hot_set.seed(_SlowSession(old, concurrent_writes)))
+    assert _ids(hot_set.latest(10)) == [9, 3, 1]
+    assert hot_set._changes == [] and hot_set._seeding == 0
+
+
+def test_confirmed_alarm_is_ignored():
+    hot_set = UnconfirmedAlarmSet()
+    asyncio.run(hot_set.seed(_SlowSession([])))
+    hot_set.add(_alarm(1, is_confirmed=True))
+    assert hot_set.latest(10) == []
+
+
+def test_capacity_drops_oldest_and_marks_incomplete():
+    hot_set = UnconfirmedAlarmSet(capacity=3)
+    asyncio.run(hot_set.seed(_SlowSession([_alarm(i) for i in range(1, 4)])))
+    assert hot_set.complete
+    hot_set.add(_alarm(4))
+    assert not hot_set.complete
+    assert _ids(hot_set.latest(3)) == [4, 3, 2]
+    # Cần nhiều hơn đang giữ mà tập không đầy đủ: để caller đọc DB
+    assert hot_set.latest(4) is None
+    hot_set.add(_alarm(10, minute=-1))   # cũ hơn mọi alarm đang giữ
+    assert _ids(hot_set.latest(3)) == [4, 3, 2]
+
+
+def test_seed_over_capacity_is_incomplete():
+    hot_set = UnconfirmedAlarmSet(capacity=2)
+    asyncio.run(hot_set.seed(_SlowSession([_alarm(i) for i in range(1, 5)])))
+    assert not hot_set.complete
+    assert _ids(hot_set.latest(2)) == [4, 3]
+
+
+def test_disable():
+    hot_set = UnconfirmedAlarmSet()
+    asyncio.run(hot_set.seed(_SlowSession([_alarm(1)])))
+    hot_set.disable()
+    assert hot_set.latest(1) is None
+    asyncio.run(hot_set.seed(_SlowSession([_alarm(1)])))
+    assert hot_set.latest(1) is None
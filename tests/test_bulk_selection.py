@@ -0,0 +1,46 @@
+"""Guard của thao tác hàng loạt: không có điều kiện thực sự thì không được UPDATE cả bảng."""
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from func.api_router.v1.camera_router import _bulk_selection
+from func.event_filters import filter_alarms, filter_worker_events
+from model.db_model import Alarm, AlarmBulkFilter, WorkerEvent, WorkerEventBulkFilter
+
+
+def _alarm_update():
+    return update(Alarm).where(Alarm.is_confirmed == False).values(is_confirmed=True)
+
+
+def _event_update():
+    return update(WorkerEvent).where(WorkerEvent.status != 1).values(status=1)
+
+
+@pytest.mark.parametrize("filters", [
+    None,
+    AlarmBulkFilter(),
+    AlarmBulkFilter(error_code=""),
+    AlarmBulkFilter(location="", start_time=0, end_time=0),
+])
+def test_alarm_bulk_without_condition_is_rejected(filters):
+    with pytest.raises(HTTPException) as error:
+        _bulk_selection(_alarm_update(), Alarm.id, None, filters, filter_alarms)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("filters", [
+    WorkerEventBulkFilter(error_code=""),
+    WorkerEventBulkFilter(query="", event_id="", start_time=0),
+])
+def test_worker_event_bulk_without_condition_is_rejected(filters):
+    with pytest.raises(HTTPException):
+        _bulk_selection(_event_update(), WorkerEvent.id, [], filters, filter_worker_events)
+
+
+def test_bulk_with_applied_filter_or_ids():
+    stmt = _bulk_selection(_alarm_update(), Alarm.id, None, AlarmBulkFilter(location="A1"), filter_alarms)
+    assert "alarm.location" in str(stmt.whereclause)
+    stmt = _bulk_selection(_event_update(), WorkerEvent.id, None, WorkerEventBulkFilter(status=0), filter_worker_events)
+    assert "workerevent.status =" in str(stmt.whereclause)
+    stmt = _bulk_selection(_alarm_update(), Alarm.id, [1, 2], AlarmBulkFilter(error_code=""), filter_alarms)
+    assert "alarm.id IN" in str(stmt.whereclause)
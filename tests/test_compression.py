@@ -0,0 +1,95 @@
+"""Chọn encoding theo Accept-Encoding và ngưỡng minimum_size của CompressionMiddleware (không cần DB)."""
+import asyncio
+import gzip
+
+import pytest
+
+from func.compression import CompressionMiddleware, choose_encoding, is_compressible
+
+ALL = ("br", "zstd", "gzip")
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("zstd, gzip", "zstd"),
+    ("*", "br"),
+    ("*;q=0.2, gzip;q=0.8", "gzip"),
+    ("br;q=0, *;q=0.1", "zstd"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+    ("gzip;q=abc, br;q=0.1", "br"),
+])
+def test_choose_encoding(accept, expected):
+    assert choose_encoding(accept, ALL) == expected
+
+
+def test_choose_encoding_skips_missing_libraries():
+    assert choose_encoding("br, gzip;q=0.5", ("gzip",)) == "gzip"
+
+
+def test_is_compressible():
+    assert is_compressible("application/json")
+    assert is_compressible("text/csv; charset=utf-8")
+    assert is_compressible("application/problem+json")
+    assert not is_compressible("image/jpeg")
+    assert not is_compressible("application/zip")
+
+
+def _run(body_chunks, status=200, content_type="application/json", accept="gzip", etag=None):
+    headers = [(b"content-type", content_type.encode())]
+    if etag:
+        headers.append((b"etag", etag.encode()))
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+        for index, chunk in enumerate(body_chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(body_chunks) - 1})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    start = sent[0]
+    response_headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return start["status"], response_headers, body
+
+
+def test_small_body_is_sent_as_is_even_when_chunked():
+    status, headers, body = _run([b'{"a":', b"1}"])
+    assert status == 200
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
+    assert body == b'{"a":1}'
+
+
+def test_large_chunked_body_is_gzipped_and_etag_weakened():
+    chunks = [b'{"items": [' + b"1," * 80, b"2" * 200, b"]}"]
+    status, headers, body = _run(chunks, etag='"abc"')
+    assert headers["content-encoding"] == "gzip"
+    assert headers["etag"] == 'W/"abc"'
+    assert "content-length" not in headers
+    assert gzip.decompress(body) == b"".join(chunks)
+
+
+@pytest.mark.parametrize("status, content_type", [(304, "application/json"), (200, "image/jpeg")])
+def test_not_modified_and_binary_are_passed_through(status, content_type):
+    payload = b"x" * 500
+    _, headers, body = _run([payload], status=status, content_type=content_type)
+    assert "content-encoding" not in headers
+    assert body == payload
+
+
+def test_no_acceptable_encoding_is_passed_through():
+    payload = b"x" * 500
+    _, headers, body = _run([payload], accept="identity")
+    assert "content-encoding" not in headers
+    assert body == payload
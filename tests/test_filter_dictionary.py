@@ -0,0 +1,45 @@
+"""FilterDictionary.rebuild không được làm mất giá trị add() trong lúc đang chờ DB."""
+import asyncio
+
+from func.filter_dictionary import FilterDictionary
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _SlowSession:
+    """Giả session: mỗi SELECT DISTINCT nhường event loop, trả một location cũ."""
+
+    def __init__(self, during_query=None):
+        self.during_query = during_query
+
+    async def execute(self, statement):
+        await asyncio.sleep(0)
+        if self.during_query:
+            self.during_query()
+            self.during_query = None
+        return _Result([("LINE-1",)])
+
+
+def test_add_during_rebuild_is_kept():
+    dictionary = FilterDictionary()
+    session = _SlowSession(lambda: dictionary.add("alarm", location="LINE-NEW", error_code="E42"))
+    asyncio.run(dictionary.rebuild(session))
+    assert "LINE-NEW" in dictionary.values("alarm", "location")
+    assert "E42" in dictionary.values("alarm", "error_code")
+    assert "LINE-1" in dictionary.values("worker_event", "location")
+
+
+def test_rebuild_replaces_values_and_bumps_version():
+    dictionary = FilterDictionary()
+    dictionary.add("alarm", location="GONE")
+    version = dictionary.version
+    asyncio.run(dictionary.rebuild(_SlowSession()))
+    assert dictionary.values("alarm", "location") == ["LINE-1"]
+    assert dictionary.version > version
+    assert dictionary._changes == []
@@ -0,0 +1,64 @@
+"""Cursor keyset của /worker-events, /alarms, /error-detail (không cần DB)."""
+import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from func.pagination import apply_keyset, decode_cursor, encode_cursor, next_cursor, sort_expression
+from model.db_model import WorkerEvent
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("location", "desc", "B09 4F", 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "location", "desc") == ("B09 4F", 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!!", encode_cursor("id", "asc", 1, 1)[:-3], ""])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "id", "asc")
+    assert error.value.status_code == 400
+
+
+def test_cursor_must_match_sort():
+    cursor = encode_cursor("timestamp", "asc", "2024-01-01T00:00:00+00:00", 7)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "timestamp", "desc")
+    assert error.value.status_code == 400
+
+
+def test_nullable_sort_column_is_coalesced():
+    assert "coalesce(workerevent.camera_name, '')" in _sql(select(sort_expression(WorkerEvent, "camera_name")))
+    assert "coalesce" not in _sql(select(sort_expression(WorkerEvent, "location")))
+    assert "coalesce" not in _sql(select(sort_expression(WorkerEvent, "id")))
+
+
+def test_apply_keyset_compares_row_values():
+    cursor = encode_cursor("camera_name", "desc", "cam", 10)
+    sql = _sql(apply_keyset(select(WorkerEvent.id), WorkerEvent, "camera_name", "desc", cursor))
+    assert "(coalesce(workerevent.camera_name, ''), workerevent.id) < (" in sql
+    assert "ORDER BY coalesce(workerevent.camera_name, '') DESC, workerevent.id DESC" in sql
+    assert "OFFSET" not in sql
+
+
+def test_apply_keyset_by_id_and_datetime_cursor():
+    sql = _sql(apply_keyset(select(WorkerEvent.id), WorkerEvent, "id", "asc", encode_cursor("id", "asc", 5, 5)))
+    assert "workerevent.id > " in sql
+    stamp = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    stmt = apply_keyset(select(WorkerEvent.id), WorkerEvent, "timestamp", "asc", encode_cursor("timestamp", "asc", stamp, 3))
+    bound = [value for value in stmt.compile().params.values() if isinstance(value, datetime.datetime)]
+    assert bound == [stamp]
+
+
+def test_next_cursor_only_when_page_is_full():
+    rows = [SimpleNamespace(id=i, camera_name=None) for i in (3, 2, 1)]
+    assert next_cursor(rows, "camera_name", "desc", 4) is None
+    assert decode_cursor(next_cursor(rows, "camera_name", "desc", 3), "camera_name", "desc") == ("", 1)
@@ -0,0 +1,91 @@
+"""
+Đếm số câu SQL mỗi endpoint đọc camera / tag chạy, so với ngân sách QUERY_BUDGETS.
+Dùng để chặn việc eager load dây chuyền (camera -> tag -> camera ...) quay lại.
+Chạy trên database tạm của conftest (throwaway_database_url), không chạy lifespan / migration.
+"""
+import asyncio
+from typing import Dict
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from func.api_gateway import create_app
+from func.auth.v1.auth import get_current_user
+from func.response_cache import response_cache
+from model.db_model import CameraConfig, CameraConfigTagLink, Tag, get_session
+
+# Số câu SQL tối đa cho mỗi request (không tính auth, đã override)
+QUERY_BUDGETS: Dict[str, int] = {
+    "GET /v1/cameras/": 2,                       # camera + tag của các camera đó
+    "GET /v1/cameras/?tag_ids={tag_id}": 2,
+    "GET /v1/cameras/{camera_id}": 2,            # camera + selectinload tags
+    "GET /v1/cameras/cameras/{camera_id}": 2,
+    "GET /v1/tags/": 1,
+    "GET /v1/tags/{tag_id}": 2,                  # tag + selectinload camera_configs
+}
+
+
+class _AdminUser:
+    id = 0
+    username = "query_count_test"
+    config = True
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+async def _seed(session_maker):
+    async with session_maker() as session:
+        tag = Tag(tag_name="query-count")
+        cameras = [
+            CameraConfig(name=f"query-count-{i}", webrtc_ip=f"10.0.0.{i}", panorama=False, tags=[tag])
+            for i in range(3)
+        ]
+        session.add_all(cameras)
+        await session.commit()
+        return cameras[0].id, tag.id
+
+
+@pytest.fixture(scope="module")
+def query_client(throwaway_database_url):
+    # NullPool: TestClient chạy mỗi request trong event loop riêng, không giữ connection giữa các loop
+    engine = create_async_engine(throwaway_database_url, poolclass=NullPool)
+    session_maker = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    ids = asyncio.run(_seed(session_maker))
+
+    async def _test_session():
+        async with session_maker() as session:
+            yield session
+
+    app = create_app()
+    app.dependency_overrides[get_current_user] = lambda: _AdminUser()
+    app.dependency_overrides[get_session] = _test_session
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        # Không dùng "with TestClient(...)": lifespan (create_all trên DB cấu hình, migration, task nền) không chạy
+        yield TestClient(app), counter, ids
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter)
+        asyncio.run(engine.dispose())
+
+
+@pytest.mark.parametrize("route", list(QUERY_BUDGETS))
+def test_query_budget(query_client, route):
+    client, counter, (camera_id, tag_id) = query_client
+    method, path = route.split(" ", 1)
+    path = path.format(camera_id=camera_id, tag_id=tag_id)
+    response_cache.clear()
+    counter.count = 0
+    response = client.request(method, path)
+    assert response.status_code == 200, response.text
+    assert counter.count <= QUERY_BUDGETS[route], f"{method} {path}: {counter.count} queries, budget {QUERY_BUDGETS[route]}"
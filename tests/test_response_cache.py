@@ -0,0 +1,109 @@
+"""ResponseCache: single-flight khi nhiều request cùng miss, hết hiệu lực khi version bảng tăng (không cần DB)."""
+import asyncio
+
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+
+from func.response_cache import ResponseCache
+from func.table_version import table_versions
+
+TABLE = "response_cache_test"
+
+
+def _request(path="/v1/alarms/latest", query=b"limit=10&offset=0"):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+
+class _Compute:
+    """compute() giả: đếm số lần gọi, chờ gate trước khi trả response."""
+
+    def __init__(self, status_code=200, error=None):
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.status_code = status_code
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.gate.wait()
+        if self.error:
+            raise self.error
+        return Response(content=f"body-{self.calls}", status_code=self.status_code, media_type="application/json")
+
+
+async def _concurrent(cache, compute, count=5):
+    tasks = [asyncio.ensure_future(cache.get_or_compute(_request(), (TABLE,), compute)) for _ in range(count)]
+    await asyncio.sleep(0)
+    compute.gate.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_concurrent_misses_run_compute_once():
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+        compute = _Compute()
+        responses = await _concurrent(cache, compute)
+        assert compute.calls == 1
+        assert [response.body for response in responses] == [b"body-1"] * 5
+        assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 0)
+        # Lần sau trả từ cache, không gọi compute
+        response = await cache.get_or_compute(_request(), (TABLE,), compute)
+        assert response.body == b"body-1" and compute.calls == 1 and cache.hits == 1
+
+    asyncio.run(scenario())
+
+
+def test_version_bump_invalidates_entry():
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+        compute = _Compute()
+        compute.gate.set()
+        await cache.get_or_compute(_request(), (TABLE,), compute)
+        table_versions.bump(TABLE)
+        response = await cache.get_or_compute(_request(), (TABLE,), compute)
+        assert response.body == b"body-2" and compute.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_query_order_and_format_in_key():
+    assert ResponseCache.key(_request(query=b"a=1&b=2")) == ResponseCache.key(_request(query=b"b=2&a=1"))
+    assert ResponseCache.key(_request(query=b"a=1")) != ResponseCache.key(_request(query=b"a=2"))
+
+
+def test_error_is_shared_and_not_cached():
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+        compute = _Compute(error=RuntimeError("db down"))
+        results = await _concurrent(cache, compute, count=3)
+        assert compute.calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.stats()["entries"] == 0 and cache.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("status_code", [304, 404])
+def test_non_200_is_not_cached(status_code):
+    async def scenario():
+        cache = ResponseCache(ttl=60)
+        compute = _Compute(status_code=status_code)
+        compute.gate.set()
+        await cache.get_or_compute(_request(), (TABLE,), compute)
+        await cache.get_or_compute(_request(), (TABLE,), compute)
+        assert compute.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_eviction_by_entry_count():
+    async def scenario():
+        cache = ResponseCache(ttl=60, max_entries=2)
+        compute = _Compute()
+        compute.gate.set()
+        for offset in range(3):
+            await cache.get_or_compute(_request(query=f"offset={offset}".encode()), (TABLE,), compute)
+        assert cache.stats()["entries"] == 2 and cache.evictions == 1
+
+    asyncio.run(scenario())
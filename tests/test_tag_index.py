@@ -0,0 +1,48 @@
+"""Inverted index tag -> bitset camera dùng cho GET /v1/cameras/?tag_ids=... (không cần DB)."""
+from func.tag_index import TagIndex, bitset_ids
+
+
+def _index():
+    index = TagIndex()
+    index.ready = True
+    index.set_camera_tags(1, [10, 20])
+    index.set_camera_tags(2, [10])
+    index.set_camera_tags(70, [10, 20, 30])   # vượt 64 bit
+    return index
+
+
+def test_bitset_ids():
+    assert bitset_ids(0) == []
+    assert bitset_ids(0b1011) == [0, 1, 3]
+    assert bitset_ids(1 << 200 | 1 << 5) == [5, 200]
+
+
+def test_not_ready_returns_none():
+    assert TagIndex().camera_ids([1]) is None
+
+
+def test_camera_ids_is_and_of_tags():
+    index = _index()
+    assert index.camera_ids([10]) == [1, 2, 70]
+    assert index.camera_ids([10, 20]) == [1, 70]
+    assert index.camera_ids([10, 20, 30]) == [70]
+    assert index.camera_ids([10, 99]) == []
+
+
+def test_set_camera_tags_replaces_previous_tags():
+    index = _index()
+    index.set_camera_tags(1, [30])
+    assert index.camera_ids([20]) == [70]
+    assert index.camera_ids([30]) == [1, 70]
+    index.set_camera_tags(1, [])
+    assert 1 not in index._tags_by_camera
+
+
+def test_remove_camera_and_tag():
+    index = _index()
+    index.remove_camera(70)
+    assert index.camera_ids([10]) == [1, 2]
+    assert 30 not in index._cameras_by_tag
+    index.remove_tag(10)
+    assert index.camera_ids([10]) == []
+    assert index._tags_by_camera == {1: {20}}